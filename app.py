@@ -1,16 +1,27 @@
 import os
 import json
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file
+from datetime import datetime, timedelta
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.utils import secure_filename
 
 from src.config import Config
-from src.models import db, Lead, Conversation
-from src.services.excel_service import import_leads_from_excel, export_leads_to_excel
+from src.migrations import migrate
+from src.models import db, Lead, Conversation, SendJob
+from src.services.excel_service import import_leads_from_excel, export_leads_to_excel, export_filename, iter_file_and_remove, iter_leads_csv
 from src.services.gemini_service import GeminiClient
+from src.services.lead_index import LeadIndex
+from src.services.lead_query import LeadFilters, list_leads
+from src.services.llm_cache import ResponseCache
 from src.services.linkedin_service import LinkedInAutomation
 from src.services.scheduler_service import scheduler, schedule_jobs
+from src.services.action_scheduler import ActionLimit, ActionScheduler, ActionThrottled
+from src.services.send_queue import SendQueue
+from src.services.page_readiness import PacingPolicy, PageReadiness
+from src.services.selector_registry import SelectorRegistry
+from src.services.metrics import observe_commits, registry as metrics_registry
+from src.services.text_entry import TextEntry
+from src.services.sse_server import EventStreamServer
 from src.services.event_bus import bus
 
 
@@ -18,13 +29,88 @@ def create_app() -> Flask:
     app = Flask(__name__, template_folder="templates", static_folder="static")
     app.config.from_object(Config)
     db.init_app(app)
+    observe_commits()
 
     with app.app_context():
         db.create_all()
+        migrate(db.engine)
 
     # Initialize services
-    app.gemini_client = GeminiClient(api_key=app.config.get("GEMINI_API_KEY"))
-    app.linkedin_bot = LinkedInAutomation(headless=app.config.get("SELENIUM_HEADLESS", True))
+    llm_cache = None
+    if app.config.get("LLM_CACHE_ENABLED", True):
+        llm_cache = ResponseCache(
+            app.config.get("LLM_CACHE_PATH") or os.path.join(app.instance_path, "llm_cache.db"),
+            ttl_seconds=app.config.get("LLM_CACHE_TTL_SEC", 86400),
+            max_entries=app.config.get("LLM_CACHE_MAX_ENTRIES", 5000),
+        )
+    app.gemini_client = GeminiClient(
+        api_key=app.config.get("GEMINI_API_KEY"),
+        requests_per_minute=app.config.get("GEMINI_REQUESTS_PER_MINUTE", 15),
+        max_concurrency=app.config.get("GEMINI_MAX_CONCURRENCY", 4),
+        max_retries=app.config.get("GEMINI_MAX_RETRIES", 4),
+        model_name=app.config.get("GEMINI_MODEL", "gemini-1.5-flash"),
+        cache=llm_cache,
+        context_token_budget=app.config.get("CONTEXT_TOKEN_BUDGET", 1500),
+        context_tail_turns=app.config.get("CONTEXT_TAIL_TURNS", 20),
+        summary_tokens=app.config.get("CONTEXT_SUMMARY_TOKENS", 300),
+        reply_mode=app.config.get("GEMINI_REPLY_MODE", "combined"),
+    )
+    app.linkedin_bot = LinkedInAutomation(
+        headless=app.config.get("SELENIUM_HEADLESS", True),
+        profile_dir=app.config.get("SELENIUM_PROFILE_DIR"),
+        pool_size=app.config.get("SELENIUM_POOL_SIZE", 1),
+        checkout_timeout=app.config.get("SELENIUM_POOL_CHECKOUT_TIMEOUT_SEC"),
+        text_entry=TextEntry(
+            strategy=app.config.get("TEXT_ENTRY_STRATEGY", "cdp"),
+            pacing=app.config.get("TEXT_ENTRY_PACING", "brisk"),
+        ),
+        readiness=PageReadiness(idle_ms=app.config.get("NETWORK_IDLE_MS", 500)),
+        pacing=PacingPolicy(app.config.get("PACING_PROFILE", "light")),
+        selectors=SelectorRegistry(
+            app.config.get("SELECTOR_STATS_PATH") or os.path.join(app.instance_path, "selector_stats.db"),
+            on_drift=lambda target, old, new: bus.emit(
+                "warning", f"LinkedIn layout changed: {target} now found by {new[1]}", {"target": target}
+            ),
+        ),
+    )
+    app.action_scheduler = ActionScheduler(
+        app.linkedin_bot,
+        slots=app.config.get("SELENIUM_POOL_SIZE", 1),
+        limits={
+            "reply": ActionLimit(app.config["LIMIT_REPLIES_PER_HOUR"], app.config["LIMIT_REPLIES_PER_DAY"]),
+            "followup": ActionLimit(app.config["LIMIT_FOLLOWUPS_PER_HOUR"], app.config["LIMIT_FOLLOWUPS_PER_DAY"]),
+            "first_message": ActionLimit(
+                app.config["LIMIT_FIRST_MESSAGES_PER_HOUR"], app.config["LIMIT_FIRST_MESSAGES_PER_DAY"]
+            ),
+        },
+        account_limit=ActionLimit(app.config["LIMIT_ACCOUNT_PER_HOUR"], app.config["LIMIT_ACCOUNT_PER_DAY"]),
+        burst=app.config.get("LIMIT_BURST", 3),
+    )
+    with app.app_context():
+        # Budgets are in memory; count what was already sent today so a restart does not reset them
+        sent_today = Conversation.query.filter(
+            Conversation.role == "assistant", Conversation.timestamp >= datetime.utcnow() - timedelta(days=1)
+        ).count()
+    app.action_scheduler.record_prior(sent_today)
+    app.lead_index = LeadIndex()
+    app.send_queue = SendQueue(
+        app,
+        poll_interval=app.config.get("SEND_QUEUE_POLL_SEC", 2.0),
+        batch_size=app.config.get("SEND_QUEUE_BATCH_SIZE", 5),
+        lease_seconds=app.config.get("SEND_QUEUE_LEASE_SEC", 600),
+        concurrency=app.config.get("SELENIUM_POOL_SIZE", 1),
+    )
+
+    app.event_stream = None
+    if app.config.get("SSE_SERVER_ENABLED", True):
+        app.event_stream = EventStreamServer(
+            bus,
+            host=app.config.get("HOST", "0.0.0.0"),
+            port=app.config.get("SSE_SERVER_PORT", 5001),
+            heartbeat=app.config.get("SSE_HEARTBEAT_SEC", 15),
+            dashboard_port=app.config.get("PORT", 5000),
+            allow_origins=app.config.get("SSE_ALLOW_ORIGINS"),
+        )
 
     # Scheduler
     schedule_jobs(app)
@@ -36,8 +122,21 @@ def create_app() -> Flask:
 def register_routes(app: Flask) -> None:
     @app.route("/")
     def index():
-        leads = Lead.query.order_by(Lead.created_at.desc()).all()
-        return render_template("index.html", leads=leads)
+        # The lead table is filled page by page from /api/leads
+        sse_port = app.event_stream.port if app.event_stream and app.event_stream.running else None
+        return render_template("index.html", sse_port=sse_port)
+
+    @app.route("/api/leads", methods=["GET"])
+    def api_leads():
+        try:
+            leads, next_cursor = list_leads(
+                LeadFilters.from_args(request.args),
+                limit=request.args.get("limit", 50, type=int),
+                cursor=request.args.get("cursor"),
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify({"leads": leads, "next_cursor": next_cursor})
 
     @app.route("/linkedin_login", methods=["POST"]) 
     def linkedin_login():
@@ -46,7 +145,13 @@ def register_routes(app: Flask) -> None:
         if not username or not password:
             flash("Username and password required", "warning")
             return redirect(url_for("index"))
-        ok = app.linkedin_bot.login(username, password)
+        try:
+            # Goes through the scheduler so a busy browser fails fast instead of holding the request
+            with app.action_scheduler.slot("login", timeout=app.config.get("LINKEDIN_LOGIN_WAIT_SEC", 15)):
+                ok = app.linkedin_bot.login(username, password)
+        except ActionThrottled:
+            flash("The browser is busy sending; try logging in again in a moment.", "warning")
+            return redirect(url_for("index"))
         if ok:
             flash("LinkedIn login successful", "success")
         else:
@@ -60,53 +165,50 @@ def register_routes(app: Flask) -> None:
             flash("No file uploaded", "danger")
             return redirect(url_for("index"))
         filename = secure_filename(file.filename)
-        if not filename.lower().endswith((".xlsx", ".xls")):
-            flash("Please upload an Excel file (.xlsx or .xls)", "warning")
+        if not filename.lower().endswith((".xlsx", ".xls", ".csv")):
+            flash("Please upload an Excel or CSV file (.xlsx, .xls or .csv)", "warning")
             return redirect(url_for("index"))
         try:
-            count = import_leads_from_excel(file)
-            flash(f"Imported {count} leads", "success")
+            result = import_leads_from_excel(file, filename=filename)
+            flash(
+                f"Imported {result.inserted} new leads, updated {result.updated}, skipped {result.skipped} "
+                f"({result.rows_per_sec:.0f} rows/s)",
+                "success",
+            )
         except Exception as exc:
             flash(f"Failed to import leads: {exc}", "danger")
         return redirect(url_for("index"))
 
     @app.route("/send_first_messages", methods=["POST"]) 
     def send_first_messages():
-        leads = Lead.query.filter_by(message_sent=False).all()
-        sent = 0
-        for lead in leads:
-            try:
-                message = app.gemini_client.generate_first_message(lead)
-                ok = app.linkedin_bot.send_message(lead.profile_url, message)
-                if ok:
-                    lead.message_sent = True
-                    lead.last_contact_time = datetime.utcnow()
-                    # best-effort: try to set thread_url if available via JS (stored in bot last nav)
-                    conv = Conversation(lead_id=lead.id, role="assistant", content=message, timestamp=datetime.utcnow())
-                    db.session.add(conv)
-                    db.session.commit()
-                    sent += 1
-            except Exception as exc:
-                db.session.rollback()
-                app.logger.exception("Failed to send first message to %s: %s", lead.profile_url, exc)
-        flash(f"Sent {sent} messages", "info")
-        return redirect(url_for("index"))
+        job = app.send_queue.enqueue_first_messages()
+        return jsonify(job.to_dict()), 202
+
+    @app.route("/jobs/<int:job_id>", methods=["GET"])
+    def job_status(job_id: int):
+        job = SendJob.query.get_or_404(job_id)
+        return jsonify(job.to_dict())
 
     @app.route("/manual_followup/<int:lead_id>", methods=["POST"]) 
     def manual_followup(lead_id: int):
         lead = Lead.query.get_or_404(lead_id)
         try:
             followup = app.gemini_client.generate_followup_message(lead)
-            ok = app.linkedin_bot.send_message(lead.profile_url, followup)
+            with app.action_scheduler.slot("followup", timeout=app.config.get("MANUAL_ACTION_TIMEOUT_SEC", 60)):
+                ok = app.linkedin_bot.send_message(lead.profile_url, followup, thread_url=lead.thread_url)
             if ok:
                 lead.follow_up_taken = True
+                lead.thread_url = app.linkedin_bot.last_thread_url or lead.thread_url
                 lead.last_contact_time = datetime.utcnow()
                 conv = Conversation(lead_id=lead.id, role="assistant", content=followup, timestamp=datetime.utcnow())
                 db.session.add(conv)
                 db.session.commit()
+                app.gemini_client.refresh_context(lead.id)
                 flash("Follow-up sent", "success")
             else:
                 flash("Failed to send follow-up", "danger")
+        except ActionThrottled as exc:
+            flash(f"Follow-up not sent: {exc}; try again later", "warning")
         except Exception as exc:
             db.session.rollback()
             app.logger.exception("Manual follow-up failed for %s: %s", lead.profile_url, exc)
@@ -116,8 +218,23 @@ def register_routes(app: Flask) -> None:
     @app.route("/export", methods=["GET"]) 
     def export():
         try:
+            if request.args.get("format") == "csv":
+                return app.response_class(
+                    stream_with_context(iter_leads_csv()),
+                    mimetype="text/csv",
+                    headers={"Content-Disposition": f"attachment; filename={export_filename('csv')}"},
+                )
+            # xlsx is a zip archive, so it is built in full before the first byte goes out;
+            # only memory stays flat. Use ?format=csv for a response that starts at once.
             path = export_leads_to_excel()
-            return send_file(path, as_attachment=True)
+            return app.response_class(
+                iter_file_and_remove(path),
+                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                headers={
+                    "Content-Disposition": f"attachment; filename={export_filename('xlsx')}",
+                    "Content-Length": str(os.path.getsize(path)),
+                },
+            )
         except Exception as exc:
             app.logger.exception("Export failed: %s", exc)
             flash("Export failed", "danger")
@@ -125,24 +242,65 @@ def register_routes(app: Flask) -> None:
 
     @app.route("/events")
     def sse_events():
+        # EventSource resends the last seen id on reconnect; resume from there
+        last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        sub = bus.subscribe(int(last_id) if last_id and last_id.isdigit() else None)
+        heartbeat = app.config.get("SSE_HEARTBEAT_SEC", 15)
+
         def stream():
-            # send history first
-            for e in bus.get_history():
-                yield f"data: {json.dumps(e)}\n\n"
-            q = bus.subscribe()
             try:
+                yield "retry: 3000\n\n"
                 while True:
-                    event = q.get()
-                    yield f"data: {json.dumps(event)}\n\n"
+                    events, missed = sub.poll(timeout=heartbeat)
+                    if missed:
+                        yield f"event: lag\ndata: {json.dumps({'missed': missed, 'total_missed': sub.missed})}\n\n"
+                    for event in events:
+                        yield f"id: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+                    if not events and not missed:
+                        yield ": heartbeat\n\n"
             finally:
-                bus.unsubscribe(q)
+                bus.unsubscribe(sub)
         return app.response_class(stream(), mimetype="text/event-stream")
 
+    @app.route("/events/stats")
+    def sse_stats():
+        return jsonify(bus.stats())
+
+    @app.route("/actions/stats")
+    def action_stats():
+        return jsonify({
+            **app.action_scheduler.stats(),
+            "text_entry": app.linkedin_bot.text_entry.stats(),
+            "page_timing": app.linkedin_bot.readiness.stats(),
+            "selectors": app.linkedin_bot.selectors.stats(),
+        })
+
+    @app.route("/inbox/stats")
+    def inbox_stats():
+        return jsonify(app.inbox_poll.stats())
+
+    @app.route("/llm/stats")
+    def llm_stats():
+        return jsonify(app.gemini_client.stats())
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     app = create_app()
     if not scheduler.running:
         scheduler.start()
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=True)
+    use_reloader = True
+    # The reloader parent only watches files; the child (WERKZEUG_RUN_MAIN) serves requests.
+    # app.debug is not set yet here, so it cannot tell the two apart.
+    serving = not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+    if serving:
+        # One queue worker set only: each start() recovers "running" items back to pending
+        app.send_queue.start()
+    if app.event_stream and serving:
+        app.event_stream.start()
+    app.run(host=app.config["HOST"], port=app.config["PORT"], debug=True, use_reloader=use_reloader)
 
 
@@ -0,0 +1,305 @@
+"""
+In-process stand-ins for Chrome/WebDriver and the Gemini model, for offline
+benchmarks of the bot pipeline.
+
+FakeLinkedIn is the DOM fixture: profiles, message threads and the inbox
+list, shared by every FakeWebDriver (one per pooled session). The drivers
+answer the locators and scripts LinkedInAutomation actually uses, with a
+configurable per-command latency and failure rate. ``layout`` picks which of
+the bot's alternative locators the pages match, to simulate markup drift.
+"""
+
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from google.api_core import exceptions as google_exceptions
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from selenium.webdriver.common.keys import Keys
+
+from src.services import linkedin_service
+from src.services.linkedin_service import LinkedInAutomation
+from src.services.text_entry import INSERT_TEXT_JS
+
+BASE = "https://www.linkedin.com"
+
+# Commands that fail at ``fail_rate``; element lookups already miss as part of normal operation
+FAILABLE = ("get", "click", "send_keys", "execute_cdp_cmd")
+
+
+@dataclass
+class FakeMessage:
+    urn: str
+    incoming: bool
+    text: str
+
+
+@dataclass
+class FakeThread:
+    thread_id: str
+    slug: str
+    name: str
+    messages: List[FakeMessage] = field(default_factory=list)
+    unread: bool = False
+    activity: int = 0
+
+    @property
+    def url(self) -> str:
+        return f"{BASE}/messaging/thread/{self.thread_id}/"
+
+
+class FakeLinkedIn:
+    """The account's side of LinkedIn: who has a thread, what it says, what was sent."""
+
+    def __init__(self, layout: int = 0):
+        self.layout = layout
+        self.threads: Dict[str, FakeThread] = {}
+        self.sent: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._clock = itertools.count(1)
+        self._urns = itertools.count(1)
+
+    @staticmethod
+    def slug_for(profile_url: str) -> str:
+        return urlsplit(profile_url).path.rstrip("/").rsplit("/", 1)[-1]
+
+    def thread_for(self, slug: str) -> FakeThread:
+        with self._lock:
+            thread = self.threads.get(f"t-{slug}")
+            if thread is None:
+                thread = self.threads[f"t-{slug}"] = FakeThread(f"t-{slug}", slug, slug.replace("-", " ").title())
+            return thread
+
+    def post(self, thread: FakeThread, text: str, incoming: bool) -> None:
+        with self._lock:
+            thread.messages.append(FakeMessage(f"urn:li:msg:{next(self._urns)}", incoming, text))
+            thread.activity = next(self._clock)
+            thread.unread = incoming
+            if not incoming:
+                self.sent.append((thread.thread_id, text))
+
+    def receive(self, profile_url: str, text: str) -> None:
+        """A lead answers: new incoming message, thread unread and at the top of the inbox."""
+        self.post(self.thread_for(self.slug_for(profile_url)), text, incoming=True)
+
+    def inbox(self) -> List[FakeThread]:
+        with self._lock:
+            return sorted(self.threads.values(), key=lambda t: t.activity, reverse=True)
+
+    def locator(self, locators) -> str:
+        return locators[self.layout % len(locators)][1]
+
+
+class FakeElement:
+    def __init__(self, driver: "FakeWebDriver", kind: str, thread: Optional[FakeThread] = None):
+        self._driver = driver
+        self.kind = kind
+        self.thread = thread
+
+    def is_displayed(self) -> bool:
+        self._driver._command("is_displayed")
+        return True
+
+    def is_enabled(self) -> bool:
+        self._driver._command("is_enabled")
+        return True
+
+    def get_attribute(self, name: str):
+        self._driver._command("get_attribute")
+        return None
+
+    def click(self) -> None:
+        self._driver._command("click")
+        if self.kind == "message_button":
+            self._driver.overlay = self._driver.site.thread_for(self._driver.page_slug)
+
+    def clear(self) -> None:
+        self._driver._command("clear")
+        self._driver.draft = ""
+
+    def send_keys(self, *keys) -> None:
+        self._driver._command("send_keys")
+        if Keys.RETURN in keys or (Keys.ENTER in keys and Keys.SHIFT not in keys):
+            self._driver.submit()
+        elif Keys.SHIFT in keys:
+            self._driver.draft += "\n"
+        else:
+            self._driver.draft += "".join(keys)
+
+    @property
+    def text(self) -> str:
+        self._driver._command("text")
+        return self._driver.draft if self.kind == "composer" else ""
+
+
+class FakeWebDriver:
+    """Enough of selenium's WebDriver for LinkedInAutomation, against a FakeLinkedIn."""
+
+    def __init__(self, site: FakeLinkedIn, latency: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+        self.site = site
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.current_url = "about:blank"
+        self.page_slug: Optional[str] = None
+        self.open_thread: Optional[FakeThread] = None
+        self.overlay: Optional[FakeThread] = None
+        self.draft = ""
+        self.commands = 0
+
+    def _command(self, name: str) -> None:
+        self.commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and name in FAILABLE and self.random.random() < self.fail_rate:
+            raise WebDriverException(f"injected failure in {name}")
+
+    # Navigation and page state
+
+    def get(self, url: str) -> None:
+        self._command("get")
+        path = urlsplit(url).path
+        self.current_url = url
+        self.page_slug = self.open_thread = self.overlay = None
+        self.draft = ""
+        if path.startswith("/in/"):
+            self.page_slug = FakeLinkedIn.slug_for(url)
+        elif path.startswith("/messaging/thread/"):
+            thread_id = path.rstrip("/").rsplit("/", 1)[-1]
+            self.open_thread = self.site.threads.get(thread_id)
+            if self.open_thread is None:
+                # LinkedIn sends unknown threads back to the inbox
+                self.current_url = f"{BASE}/messaging/"
+            else:
+                self.open_thread.unread = False
+
+    def _composer_thread(self) -> Optional[FakeThread]:
+        return self.open_thread or self.overlay
+
+    def submit(self) -> None:
+        thread = self._composer_thread()
+        if thread is not None and self.draft.strip():
+            self.site.post(thread, self.draft, incoming=False)
+        self.draft = ""
+
+    def _elements(self, value: str) -> List[FakeElement]:
+        site = self.site
+        if self.page_slug and not self.overlay and value == site.locator(LinkedInAutomation.MESSAGE_BUTTON_LOCATORS):
+            return [FakeElement(self, "message_button")]
+        if self._composer_thread() is not None and value in (
+            site.locator(LinkedInAutomation.MESSAGE_BOX_LOCATORS), site.locator(LinkedInAutomation.REPLY_BOX_LOCATORS)
+        ):
+            return [FakeElement(self, "composer")]
+        if urlsplit(self.current_url).path.startswith("/messaging") and value == site.locator(
+            LinkedInAutomation.CONVERSATION_CARD_LOCATORS
+        ):
+            return [FakeElement(self, "card", thread) for thread in site.inbox()]
+        return []
+
+    def find_element(self, by, value):
+        self._command("find_element")
+        found = self._elements(value)
+        if not found:
+            raise NoSuchElementException(value)
+        return found[0]
+
+    def find_elements(self, by, value):
+        self._command("find_elements")
+        return self._elements(value)
+
+    # Scripts: answered by identity with the bot's own script constants
+
+    def execute_script(self, script: str, *args):
+        self._command("execute_script")
+        if script == "return document.readyState":
+            return "complete"
+        if "performance.now()" in script:
+            return 1e9
+        if script == "arguments[0].click();":
+            thread = args[0].thread
+            self.current_url, self.open_thread, self.page_slug, self.overlay = thread.url, thread, None, None
+            thread.unread = False
+            return None
+        if script == linkedin_service.READ_CARDS_JS:
+            return [self._card(element.thread, i) for i, element in enumerate(args[0])]
+        if script == linkedin_service.THREAD_SIGNATURE_JS:
+            thread = self.open_thread
+            last = thread.messages[-1].urn if thread and thread.messages else ""
+            return f"{urlsplit(self.current_url).path}|{thread.name if thread else ''}|{last}"
+        if script == linkedin_service.READ_THREAD_JS:
+            return self._read_thread(args[0])
+        if script == linkedin_service.THREAD_HREF_JS:
+            thread = self._composer_thread()
+            return thread.url if thread else None
+        if script == INSERT_TEXT_JS:
+            self.draft += args[1]
+            return True
+        return None
+
+    def execute_cdp_cmd(self, cmd: str, params: dict):
+        self._command("execute_cdp_cmd")
+        if cmd == "Input.insertText":
+            self.draft += params["text"]
+        return {}
+
+    def _card(self, thread: FakeThread, index: int) -> dict:
+        last = thread.messages[-1].text if thread.messages else ""
+        return {"href": thread.url, "name": thread.name, "preview": last[:80], "time": str(thread.activity),
+                "unread": thread.unread, "index": index}
+
+    def _read_thread(self, last_n: int) -> dict:
+        thread = self.open_thread
+        if thread is None:
+            return {}
+        return {
+            "profile_url": f"{BASE}/in/{thread.slug}/",
+            "participant_name": thread.name,
+            "messages": [{"urn": m.urn, "incoming": m.incoming, "text": m.text} for m in thread.messages[-last_n:]],
+        }
+
+    def get_log(self, kind: str):
+        self._command("get_log")
+        return []
+
+    def quit(self) -> None:
+        pass
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """``generate_content`` with a fixed latency, deterministic text and injected rate limiting."""
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None) -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+            fail = self.fail_rate and self.random.random() < self.fail_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise google_exceptions.ResourceExhausted("injected rate limit")
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        if generation_config and generation_config.get("response_mime_type") == "application/json":
+            return FakeResponse(json.dumps({
+                "interest": ("interested", "not interested", "unsure")[int(digest, 16) % 3],
+                "action": "reply",
+                "summary": "Prospect answered the outreach.",
+                "reply": f"Thanks for getting back to me! Would a short call next week work? ({digest})",
+            }))
+        return FakeResponse(f"Hi there, I came across your profile and would love to connect. ({digest})")
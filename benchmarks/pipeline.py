@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the bot pipeline: lead import, queued first messages,
+inbox passes with AI replies, follow-ups and export, against a throwaway
+SQLite database with the fake WebDriver and fake Gemini model from
+benchmarks/fakes.py, so no LinkedIn or Gemini access is needed:
+
+    python benchmarks/pipeline.py --leads 10000 --sends 500 --replies 50
+    python benchmarks/pipeline.py --leads 100000 --sends 1000 --json baseline.json
+
+Reports throughput, latency percentiles and peak traced memory per scenario.
+Leads beyond --sends stay in the tables (so queries pay for the full size)
+but are parked as already answered, outside the outbound path.
+"""
+
+import argparse
+import functools
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+_tmp = tempfile.mkdtemp(prefix="pipeline-bench-")
+# Always the throwaway files: the run bulk-rewrites lead state, never point it at a real database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+os.environ["SELECTOR_STATS_PATH"] = os.path.join(_tmp, "selector_stats.db")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["JOB_METRICS_SUMMARY_INTERVAL_MIN"] = "0"
+# Rate limits and pacing are policy, not performance; take them out of the measurement
+os.environ["GEMINI_REQUESTS_PER_MINUTE"] = "1000000"
+os.environ["PACING_PROFILE"] = "none"
+os.environ["TEXT_ENTRY_PACING"] = "instant"
+os.environ["NETWORK_IDLE_MS"] = "0"
+for _kind in ("REPLIES", "FOLLOWUPS", "FIRST_MESSAGES", "ACCOUNT"):
+    os.environ[f"LIMIT_{_kind}_PER_HOUR"] = os.environ[f"LIMIT_{_kind}_PER_DAY"] = "1000000000"
+os.environ["LIMIT_BURST"] = "1000000000"
+
+from fakes import FakeGeminiModel, FakeLinkedIn, FakeWebDriver  # noqa: E402
+
+from app import create_app  # noqa: E402
+from src.models import Lead, SendJob, db  # noqa: E402
+from src.services.driver_pool import DriverPool  # noqa: E402
+from src.services.excel_service import export_leads_to_excel, import_leads_from_excel  # noqa: E402
+from src.services.metrics import StageSummary  # noqa: E402
+from src.services.scheduler_service import check_inbox_job, send_followups_job  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else None
+
+
+class Recorder:
+    """Wraps bound methods to collect per-call latencies."""
+
+    def __init__(self):
+        self.samples = []
+
+    def wrap(self, obj, name):
+        original = getattr(obj, name)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.samples.append(time.perf_counter() - started)
+
+        setattr(obj, name, timed)
+
+    def take(self):
+        samples, self.samples = self.samples, []
+        return samples
+
+
+STAGES = StageSummary()
+
+
+def measure(name, items_of, fn, samples_of=None, trace_memory=True):
+    STAGES.collect()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    outcome = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    items = items_of(outcome)
+    samples = samples_of() if samples_of else []
+    return {
+        "scenario": name,
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "per_sec": round(items / elapsed, 1) if elapsed else None,
+        "p50_ms": round(1000 * percentile(samples, 0.5), 2) if samples else None,
+        "p95_ms": round(1000 * percentile(samples, 0.95), 2) if samples else None,
+        "p99_ms": round(1000 * percentile(samples, 0.99), 2) if samples else None,
+        "peak_mb": round(peak / 2 ** 20, 1) if peak is not None else None,
+        # Where the time went, from the pipeline's own timing spans
+        "stages": STAGES.collect(),
+    }
+
+
+def leads_csv(count: int) -> bytes:
+    lines = ["Name,Role,Company,Profile URL,Email,Phone"]
+    lines += [
+        f"Lead {i},Engineer,Company {i % 500},https://www.linkedin.com/in/lead-{i}/,lead{i}@example.com,555-{i:07d}"
+        for i in range(count)
+    ]
+    return "\n".join(lines).encode("utf-8")
+
+
+def leads_xlsx(count: int) -> bytes:
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        "Name": [f"Lead {i}" for i in range(count)],
+        "Role": "Engineer",
+        "Company": [f"Company {i % 500}" for i in range(count)],
+        "Profile URL": [f"https://www.linkedin.com/in/lead-{i}/" for i in range(count)],
+        "Email": [f"lead{i}@example.com" for i in range(count)],
+        "Phone": [f"555-{i:07d}" for i in range(count)],
+    })
+    out = io.BytesIO()
+    frame.to_excel(out, index=False)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--leads", type=int, default=1000, help="leads imported")
+    parser.add_argument("--sends", type=int, default=200, help="leads that get first messages and follow-ups")
+    parser.add_argument("--replies", type=int, default=20, help="leads that answer before the inbox passes")
+    parser.add_argument("--inbox-passes", type=int, default=3)
+    parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+    parser.add_argument("--pool-size", type=int, default=1, help="fake browser sessions (send queue workers)")
+    parser.add_argument("--driver-latency-ms", type=float, default=1.0, help="per WebDriver command")
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0, help="per model call")
+    parser.add_argument("--driver-fail-rate", type=float, default=0.0)
+    parser.add_argument("--llm-fail-rate", type=float, default=0.0, help="injected 429s, retried with backoff")
+    parser.add_argument("--layout", type=int, default=0, help="which alternative locator the fake pages match")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (it slows Python code down)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.sends = min(args.sends, args.leads)
+    args.replies = min(args.replies, args.sends)
+
+    app = create_app()
+    app.config["FOLLOWUP_MAX_PER_RUN"] = max(args.sends, 1)
+    app.send_queue.concurrency = app.action_scheduler.slots = args.pool_size
+    site = FakeLinkedIn(layout=args.layout)
+    bot = app.linkedin_bot
+    bot.pool = DriverPool(
+        lambda slot: FakeWebDriver(site, args.driver_latency_ms / 1000.0, args.driver_fail_rate, seed=slot),
+        size=args.pool_size,
+    )
+    gemini = app.gemini_client
+    gemini.model = FakeGeminiModel(args.llm_latency_ms / 1000.0, args.llm_fail_rate)
+    gemini.context.summarize = gemini._summarize
+    gemini.backoff_base, gemini.backoff_max = 0.01, 0.05
+    app.send_queue.poll_interval = 0.05
+    sends, replies = Recorder(), Recorder()
+    sends.wrap(bot, "send_message")
+    replies.wrap(bot, "send_reply")
+    trace = not args.no_memory
+    results = []
+
+    payload = leads_csv(args.leads) if args.format == "csv" else leads_xlsx(args.leads)
+    with app.app_context():
+        results.append(measure(
+            f"import ({args.format})", lambda r: r.rows,
+            lambda: import_leads_from_excel(io.BytesIO(payload), f"leads.{args.format}"), trace_memory=trace,
+        ))
+        parked = Lead.query.filter(Lead.id > args.sends).update(
+            {"message_sent": True, "reply_status": "replied"}, synchronize_session=False
+        )
+        db.session.commit()
+
+        def first_messages():
+            job_id = app.send_queue.enqueue_first_messages().id
+            while True:
+                job = db.session.get(SendJob, job_id)
+                db.session.refresh(job)
+                if job.status == "done":
+                    return job.sent
+                time.sleep(0.05)
+
+        results.append(measure("first messages", lambda sent: sent, first_messages, sends.take, trace))
+        app.send_queue.stop()
+
+    contacted = [f"https://www.linkedin.com/in/lead-{i}/" for i in range(args.replies)]
+    for url in contacted:
+        site.receive(url, "Thanks for reaching out, tell me more.")
+    for number in range(1, args.inbox_passes + 1):
+        results.append(measure(f"inbox pass {number}", lambda handled: handled,
+                               lambda: check_inbox_job(app), replies.take, trace))
+
+    with app.app_context():
+        due = datetime.utcnow() - timedelta(hours=app.config["FOLLOWUP_AFTER_HOURS"] + 1)
+        Lead.query.filter(Lead.reply_status == "not replied").update(
+            {"last_contact_time": due}, synchronize_session=False
+        )
+        db.session.commit()
+    results.append(measure("follow-ups", lambda _: len(sends.samples), lambda: send_followups_job(app),
+                           sends.take, trace))
+
+    with app.app_context():
+        def export():
+            path = export_leads_to_excel()
+            os.remove(path)
+            return args.leads
+
+        results.append(measure("export (xlsx)", lambda rows: rows, export, trace_memory=trace))
+
+    print(f"{args.leads} leads ({parked} parked), {args.sends} contacted, {args.replies} replies; "
+          f"driver {args.driver_latency_ms:g}ms/command, model {args.llm_latency_ms:g}ms/call")
+    print(f"{'scenario':<18}{'items':>8}{'seconds':>10}{'per sec':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'peak MB':>10}")
+    for r in results:
+        cells = [r[k] if r[k] is not None else "-" for k in ("items", "seconds", "per_sec", "p50_ms", "p95_ms",
+                                                              "p99_ms", "peak_mb")]
+        print(f"{r['scenario']:<18}" + "".join(f"{c:>10}" if i else f"{c:>8}" for i, c in enumerate(cells)))
+    print("time by stage (top 4):")
+    for r in results:
+        ranked = sorted(r["stages"].items(), key=lambda item: item[1]["total_s"], reverse=True)[:4]
+        print(f"  {r['scenario']:<16}" + ", ".join(f"{name} {s['total_s']:.2f}s/{s['count']}" for name, s in ranked))
+    print(f"messages sent on the fake site: {len(site.sent)}, model calls: {gemini.model.calls}")
+    print("selectors:", json.dumps({t: s["fallbacks"] for t, s in bot.selectors.stats().items()}), "fallbacks")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"args": vars(args), "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
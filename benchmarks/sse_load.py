@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Load test: hundreds of concurrent SSE clients on the asyncio event stream
+server while measuring latency of the dashboard (/) and CSV upload (/upload).
+
+Starts the Flask app on a threaded werkzeug server against a throwaway SQLite
+database, so no LinkedIn or Gemini access is needed:
+
+    python benchmarks/sse_load.py --clients 300 --events 200
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+_tmp = tempfile.mkdtemp(prefix="sse-load-")
+# Always the throwaway files: the run uploads fake leads, never point it at a real database
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+os.environ["LLM_CACHE_PATH"] = os.path.join(_tmp, "llm_cache.db")
+os.environ["SELECTOR_STATS_PATH"] = os.path.join(_tmp, "selector_stats.db")
+os.environ["SSE_SERVER_PORT"] = "0"
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import create_app  # noqa: E402
+from src.services.event_bus import bus  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def csv_body(rows: int):
+    boundary = uuid.uuid4().hex
+    lines = ["Name,Role,Company,Profile URL,Email,Phone"]
+    for _ in range(rows):
+        slug = uuid.uuid4().hex[:12]
+        lines.append(f"Lead {slug},Engineer,Acme,https://www.linkedin.com/in/{slug}/,{slug}@example.com,555-0100")
+    payload = io.BytesIO()
+    payload.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"leads.csv\"\r\n".encode())
+    payload.write(b"Content-Type: text/csv\r\n\r\n")
+    payload.write("\n".join(lines).encode())
+    payload.write(f"\r\n--{boundary}--\r\n".encode())
+    return payload.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def measure_http(base: str, samples: int):
+    opener = urllib.request.build_opener(NoRedirect)
+    results = {"/": [], "/upload": []}
+    for _ in range(samples):
+        start = time.perf_counter()
+        with opener.open(base + "/", timeout=30) as resp:
+            resp.read()
+        results["/"].append((time.perf_counter() - start) * 1000.0)
+
+        body, content_type = csv_body(20)
+        req = urllib.request.Request(base + "/upload", data=body, headers={"Content-Type": content_type})
+        start = time.perf_counter()
+        try:
+            opener.open(req, timeout=30).read()
+        except urllib.error.HTTPError as exc:
+            if exc.code != 302:
+                raise
+        results["/upload"].append((time.perf_counter() - start) * 1000.0)
+    return results
+
+
+async def sse_client(port: int, received: list, index: int, ready: asyncio.Event, stop: asyncio.Event):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    # Start from the current position so replayed history is not counted
+    request = f"GET /events?last_event_id={bus.last_seq} HTTP/1.1\r\nHost: localhost\r\n\r\n"
+    writer.write(request.encode())
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")
+    ready.set()
+    try:
+        while not stop.is_set():
+            try:
+                chunk = await asyncio.wait_for(reader.readuntil(b"\n\n"), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            if chunk.startswith(b"id: "):
+                received[index] += 1
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def run_clients(port: int, count: int, received: list, connected: threading.Event, stop_flag: threading.Event):
+    async def main():
+        stop = asyncio.Event()
+        readies = [asyncio.Event() for _ in range(count)]
+        tasks = [asyncio.create_task(sse_client(port, received, i, readies[i], stop)) for i in range(count)]
+        await asyncio.gather(*(r.wait() for r in readies))
+        connected.set()
+        while not stop_flag.is_set():
+            await asyncio.sleep(0.1)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+
+
+def report(label: str, results):
+    for path, timings in results.items():
+        print(f"{label:<12}{path:<10}{statistics.mean(timings):>10.1f}{percentile(timings, 0.5):>10.1f}"
+              f"{percentile(timings, 0.95):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=20, help="requests per endpoint per phase")
+    args = parser.parse_args()
+
+    app = create_app()
+    app.event_stream.start()
+    http = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{http.server_port}"
+
+    baseline = measure_http(base, args.samples)
+
+    received = [0] * args.clients
+    connected, stop_flag = threading.Event(), threading.Event()
+    clients = threading.Thread(
+        target=run_clients, args=(app.event_stream.port, args.clients, received, connected, stop_flag), daemon=True
+    )
+    clients.start()
+    connected.wait(60)
+    print(f"{app.event_stream.stats()['clients']} SSE clients connected")
+
+    def emitter():
+        for i in range(args.events):
+            bus.emit("info", f"load event {i}")
+            time.sleep(0.01)
+
+    first_seq = bus.last_seq
+    emitting = threading.Thread(target=emitter, daemon=True)
+    emitting.start()
+    under_load = measure_http(base, args.samples)
+    emitting.join()
+
+    # Upload emits its own events too; everything after first_seq should arrive
+    expected = bus.last_seq - first_seq
+    deadline = time.time() + 10
+    while time.time() < deadline and min(received) < expected:
+        time.sleep(0.1)
+    stop_flag.set()
+    clients.join(10)
+    app.event_stream.stop()
+    http.shutdown()
+
+    print(f"{'phase':<12}{'path':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    report("baseline", baseline)
+    report("under load", under_load)
+    complete = sum(1 for n in received if n >= expected)
+    print(f"events emitted: {expected}, clients with every event: {complete}/{args.clients}, "
+          f"min received: {min(received)}")
+
+
+if __name__ == "__main__":
+    main()
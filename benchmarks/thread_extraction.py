@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-thread extraction latency of the single execute_script
+reader (read_open_thread) versus the per-element WebDriver lookups it replaced
+(_extract_participant_info + _extract_latest_message).
+
+Runs headless Chrome against a static conversation fixture, so no LinkedIn
+session is needed:
+
+    python benchmarks/thread_extraction.py --iterations 50 --messages 40
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from selenium import webdriver  # noqa: E402
+
+from src.services.linkedin_service import LinkedInAutomation  # noqa: E402
+
+
+def build_fixture(message_count: int) -> str:
+    events = []
+    for i in range(message_count):
+        incoming = i % 2 == 1
+        picture = '<img class="msg-s-event-listitem__profile-picture">' if incoming else ""
+        link = '<a class="msg-s-event-listitem__link" href="https://www.linkedin.com/in/jane-doe/">Jane</a>' if incoming else ""
+        events.append(
+            f'<div data-event-urn="urn:li:msg:{i}" class="msg-s-event-listitem{" msg-s-event-listitem--other" if incoming else ""}">'
+            f'{picture}{link}<div class="msg-s-event__content"><p class="msg-s-event-listitem__body">Message number {i}</p></div></div>'
+        )
+    return (
+        "<html><body><header>"
+        '<a class="msg-entity-lockup__link" href="https://www.linkedin.com/in/jane-doe/">'
+        '<h2 class="msg-entity-lockup__entity-title">Jane Doe</h2></a>'
+        "</header><main>" + "".join(events) + "</main></body></html>"
+    )
+
+
+class CommandCounter:
+    """Counts WebDriver commands (chromedriver round trips) issued by a driver."""
+
+    def __init__(self, driver):
+        self.count = 0
+        original = driver.execute
+
+        def execute(command, params=None):
+            self.count += 1
+            return original(command, params)
+
+        driver.execute = execute
+
+
+def measure(fn, iterations: int, counter: CommandCounter):
+    timings = []
+    counter.count = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    timings.sort()
+    return {
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "round_trips": counter.count / iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--messages", type=int, default=30, help="messages in the fixture thread")
+    args = parser.parse_args()
+
+    fixture = os.path.join(tempfile.mkdtemp(), "thread.html")
+    with open(fixture, "w", encoding="utf-8") as fh:
+        fh.write(build_fixture(args.messages))
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get("file://" + fixture)
+        bot = LinkedInAutomation(headless=True)
+        bot._local.pooled = type("Pinned", (), {"driver": driver})()
+        counter = CommandCounter(driver)
+
+        def legacy():
+            bot._extract_participant_info()
+            bot._extract_latest_message()
+
+        results = {
+            "element lookups": measure(legacy, args.iterations, counter),
+            "execute_script": measure(lambda: bot.read_open_thread(last_n=5), args.iterations, counter),
+        }
+    finally:
+        driver.quit()
+
+    print(f"{'approach':<18}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'round trips':>13}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['round_trips']:>13.1f}")
+    speedup = results["element lookups"]["mean_ms"] / max(results["execute_script"]["mean_ms"], 1e-9)
+    print(f"speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
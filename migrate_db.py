@@ -1,38 +1,46 @@
 #!/usr/bin/env python3
 """
-Database migration script to add missing columns to existing database.
-Run this once to fix the schema mismatch.
+Apply pending schema migrations (see src/migrations.py) to the configured
+database. The app also runs them on startup; use this to migrate without
+starting the bot.
+
+    python migrate_db.py           # apply pending migrations
+    python migrate_db.py --check   # also verify hot queries avoid full table scans
 """
 
-import sqlite3
-import os
-
-def migrate_database():
-    db_path = os.path.join('instance', 'app.db')
-    
-    if not os.path.exists(db_path):
-        print("Database doesn't exist yet. Run the app first to create it.")
-        return
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Check if columns exist
-    cursor.execute("PRAGMA table_info(leads)")
-    columns = [row[1] for row in cursor.fetchall()]
-    
-    # Add missing columns
-    if 'thread_url' not in columns:
-        cursor.execute("ALTER TABLE leads ADD COLUMN thread_url VARCHAR(512)")
-        print("Added thread_url column")
-    
-    if 'last_seen_msg_token' not in columns:
-        cursor.execute("ALTER TABLE leads ADD COLUMN last_seen_msg_token VARCHAR(128)")
-        print("Added last_seen_msg_token column")
-    
-    conn.commit()
-    conn.close()
-    print("Database migration completed successfully!")
+import sys
+
+from flask import Flask
+
+from src.config import Config
+from src.migrations import check_query_plans, migrate
+from src.models import db
+
+
+def migrate_database(check: bool = False) -> int:
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        applied = migrate(db.engine)
+        if applied:
+            print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+        else:
+            print("Database schema is up to date.")
+
+        if not check:
+            return 0
+        failures = 0
+        for result in check_query_plans(db.engine):
+            status = "FULL SCAN" if result["full_scan"] else "ok"
+            print(f"[{status}] {result['query']}")
+            for step in result["plan"]:
+                print(f"    {step}")
+            failures += int(result["full_scan"])
+        return 1 if failures else 0
+
 
 if __name__ == "__main__":
-    migrate_database()
\ No newline at end of file
+    sys.exit(migrate_database(check="--check" in sys.argv[1:]))
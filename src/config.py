@@ -9,16 +9,83 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///app.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Dashboard address; the live activity stream binds the same host
+    HOST = os.environ.get("HOST", "0.0.0.0")
+    PORT = int(os.environ.get("PORT", "5000"))
 
     GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
+    GEMINI_REQUESTS_PER_MINUTE = int(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", "15"))
+    GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4"))
+    GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "4"))
+    GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+    # combined: classify and draft a reply in one structured call; separate: two calls
+    GEMINI_REPLY_MODE = os.environ.get("GEMINI_REPLY_MODE", "combined").lower()
+    # Prompt context: recent turns verbatim, older turns as a rolling summary
+    CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONTEXT_TAIL_TURNS = int(os.environ.get("CONTEXT_TAIL_TURNS", "20"))
+    CONTEXT_SUMMARY_TOKENS = int(os.environ.get("CONTEXT_SUMMARY_TOKENS", "300"))
+
+    # LLM response cache (empty path = instance/llm_cache.db, TTL 0 = never expire)
+    LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "")
+    LLM_CACHE_TTL_SEC = int(os.environ.get("LLM_CACHE_TTL_SEC", str(24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "5000"))
 
     # Selenium settings
     SELENIUM_HEADLESS = os.environ.get("SELENIUM_HEADLESS", "true").lower() == "true"
     SELENIUM_PROFILE_DIR = os.environ.get("SELENIUM_PROFILE_DIR", "selenium_profile")
+    # Number of concurrent Chrome sessions; each one gets its own profile directory
+    SELENIUM_POOL_SIZE = int(os.environ.get("SELENIUM_POOL_SIZE", "1"))
+    SELENIUM_POOL_CHECKOUT_TIMEOUT_SEC = float(os.environ.get("SELENIUM_POOL_CHECKOUT_TIMEOUT_SEC", "600"))
+    # How long the login form waits for a free browser before giving up
+    LINKEDIN_LOGIN_WAIT_SEC = float(os.environ.get("LINKEDIN_LOGIN_WAIT_SEC", "15"))
+    # Message typing: cdp | script | keys, paced instant | brisk | human
+    TEXT_ENTRY_STRATEGY = os.environ.get("TEXT_ENTRY_STRATEGY", "cdp").lower()
+    TEXT_ENTRY_PACING = os.environ.get("TEXT_ENTRY_PACING", "brisk").lower()
+    # Deliberate pauses between browser steps (none | light | human), on top of waiting for the page
+    PACING_PROFILE = os.environ.get("PACING_PROFILE", "light").lower()
+    NETWORK_IDLE_MS = int(os.environ.get("NETWORK_IDLE_MS", "500"))
+    # Which DOM locator matched each UI target; defaults to instance/selector_stats.db
+    SELECTOR_STATS_PATH = os.environ.get("SELECTOR_STATS_PATH", "")
+
+    # LinkedIn action budgets (messages per hour / per day), per action type and for the account
+    LIMIT_REPLIES_PER_HOUR = float(os.environ.get("LIMIT_REPLIES_PER_HOUR", "30"))
+    LIMIT_REPLIES_PER_DAY = float(os.environ.get("LIMIT_REPLIES_PER_DAY", "150"))
+    LIMIT_FOLLOWUPS_PER_HOUR = float(os.environ.get("LIMIT_FOLLOWUPS_PER_HOUR", "15"))
+    LIMIT_FOLLOWUPS_PER_DAY = float(os.environ.get("LIMIT_FOLLOWUPS_PER_DAY", "60"))
+    LIMIT_FIRST_MESSAGES_PER_HOUR = float(os.environ.get("LIMIT_FIRST_MESSAGES_PER_HOUR", "15"))
+    LIMIT_FIRST_MESSAGES_PER_DAY = float(os.environ.get("LIMIT_FIRST_MESSAGES_PER_DAY", "80"))
+    LIMIT_ACCOUNT_PER_HOUR = float(os.environ.get("LIMIT_ACCOUNT_PER_HOUR", "40"))
+    LIMIT_ACCOUNT_PER_DAY = float(os.environ.get("LIMIT_ACCOUNT_PER_DAY", "200"))
+    LIMIT_BURST = float(os.environ.get("LIMIT_BURST", "3"))
+    # How long a dashboard-triggered action may wait for its turn
+    MANUAL_ACTION_TIMEOUT_SEC = float(os.environ.get("MANUAL_ACTION_TIMEOUT_SEC", "60"))
 
     # Scheduler
+    # Inbox polling adapts between these: the minimum after new replies, backing off to the maximum
+    JOB_CHECK_INBOX_MIN_SEC = float(os.environ.get("JOB_CHECK_INBOX_MIN_SEC", "30"))
     JOB_CHECK_INBOX_INTERVAL_MIN = int(os.environ.get("JOB_CHECK_INBOX_INTERVAL_MIN", "10"))
     JOB_FOLLOWUP_INTERVAL_MIN = int(os.environ.get("JOB_FOLLOWUP_INTERVAL_MIN", "30"))
     FOLLOWUP_AFTER_HOURS = int(os.environ.get("FOLLOWUP_AFTER_HOURS", "24"))
+    # Due leads handled per follow-up run, oldest contact first; the rest wait for the next run
+    FOLLOWUP_MAX_PER_RUN = int(os.environ.get("FOLLOWUP_MAX_PER_RUN", "50"))
+    # Digest of time spent per pipeline stage posted to the event stream; 0 disables
+    JOB_METRICS_SUMMARY_INTERVAL_MIN = int(os.environ.get("JOB_METRICS_SUMMARY_INTERVAL_MIN", "15"))
+
+    # Live activity stream
+    SSE_HEARTBEAT_SEC = float(os.environ.get("SSE_HEARTBEAT_SEC", "15"))
+    # Serve the dashboard stream from an asyncio server on its own port instead
+    # of holding a Flask worker thread per open tab
+    SSE_SERVER_ENABLED = os.environ.get("SSE_SERVER_ENABLED", "true").lower() == "true"
+    SSE_SERVER_PORT = int(os.environ.get("SSE_SERVER_PORT", "5001"))
+    # Origins allowed to read the stream, comma separated; empty = the dashboard's own origin only
+    SSE_ALLOW_ORIGINS = [o.strip() for o in os.environ.get("SSE_ALLOW_ORIGINS", "").split(",") if o.strip()]
+
+    # Background send queue
+    SEND_QUEUE_POLL_SEC = float(os.environ.get("SEND_QUEUE_POLL_SEC", "2"))
+    # Leads claimed per worker pass; their messages are generated concurrently
+    SEND_QUEUE_BATCH_SIZE = int(os.environ.get("SEND_QUEUE_BATCH_SIZE", "5"))
+    # A claimed item whose worker stops renewing this long is handed to another worker
+    SEND_QUEUE_LEASE_SEC = float(os.environ.get("SEND_QUEUE_LEASE_SEC", "600"))
 
 
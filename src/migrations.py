@@ -0,0 +1,187 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+db.create_all() only creates missing tables, so column and index changes to
+existing tables are applied here, in order, and recorded in
+schema_migrations. Every step is idempotent so it is safe on databases that
+create_all() already built from the current models.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Connection, Engine
+
+from src.models import Conversation, Lead, SendJobItem
+from src.services.lead_index import normalize_profile_url
+
+
+def _columns(conn: Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+
+
+def _add_lead_thread_columns(conn: Connection) -> None:
+    columns = _columns(conn, "leads")
+    if "thread_url" not in columns:
+        conn.execute(text("ALTER TABLE leads ADD COLUMN thread_url VARCHAR(512)"))
+    if "last_seen_msg_token" not in columns:
+        conn.execute(text("ALTER TABLE leads ADD COLUMN last_seen_msg_token VARCHAR(128)"))
+
+
+def _add_hot_path_indexes(conn: Connection) -> None:
+    statements = [
+        # Reply dedup and conversation context: per-lead history ordered by time
+        "CREATE INDEX IF NOT EXISTS ix_conversations_lead_ts ON conversations (lead_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_conversations_lead_role_ts ON conversations (lead_id, role, timestamp)",
+        # Follow-up selection and sent-lead allowlist
+        "CREATE INDEX IF NOT EXISTS ix_leads_followup ON leads (message_sent, reply_status, last_contact_time)",
+        # Incremental lead index refresh and dashboard ordering
+        "CREATE INDEX IF NOT EXISTS ix_leads_updated_at ON leads (updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_leads_created_at ON leads (created_at)",
+        # Send queue claim order
+        "CREATE INDEX IF NOT EXISTS ix_send_job_items_claim ON send_job_items (status, job_id, id)",
+    ]
+    # No ANALYZE here: stats gathered on a young, small table would steer the
+    # planner to full scans long after the table has grown.
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _add_dashboard_indexes(conn: Connection) -> None:
+    # Filtered dashboard pages walk (filter, created_at) in keyset order; SQLite
+    # appends the rowid (= leads.id) to every index, covering the id tiebreak.
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_leads_reply_created ON leads (reply_status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_leads_interest_created ON leads (interest_level, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_leads_sent_created ON leads (message_sent, created_at)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _add_send_item_lease_columns(conn: Connection) -> None:
+    columns = _columns(conn, "send_job_items")
+    if "claimed_by" not in columns:
+        conn.execute(text("ALTER TABLE send_job_items ADD COLUMN claimed_by VARCHAR(128)"))
+    if "lease_until" not in columns:
+        conn.execute(text("ALTER TABLE send_job_items ADD COLUMN lease_until DATETIME"))
+
+
+def _add_lead_profile_key(conn: Connection) -> None:
+    if "profile_key" not in _columns(conn, "leads"):
+        conn.execute(text("ALTER TABLE leads ADD COLUMN profile_key VARCHAR(512)"))
+    # Oldest lead keeps the key; later spellings of the same profile stay NULL rather than fail the index
+    taken = {key for (key,) in conn.execute(text("SELECT profile_key FROM leads WHERE profile_key IS NOT NULL"))}
+    rows = conn.execute(text("SELECT id, profile_url FROM leads WHERE profile_key IS NULL ORDER BY id")).fetchall()
+    updates = []
+    for lead_id, profile_url in rows:
+        key = normalize_profile_url(profile_url)
+        if key and key not in taken:
+            taken.add(key)
+            updates.append({"id": lead_id, "key": key})
+    if updates:
+        conn.execute(text("UPDATE leads SET profile_key = :key WHERE id = :id"), updates)
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_leads_profile_key ON leads (profile_key)"))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "lead thread_url and last_seen_msg_token columns", _add_lead_thread_columns),
+    (2, "hot path indexes", _add_hot_path_indexes),
+    (3, "dashboard listing indexes", _add_dashboard_indexes),
+    (4, "send job item claim leases", _add_send_item_lease_columns),
+    (5, "canonical lead profile key", _add_lead_profile_key),
+]
+
+
+def migrate(engine: Engine) -> List[int]:
+    """Apply pending migrations in version order and return the versions applied."""
+    applied = []
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at DATETIME NOT NULL)"
+        ))
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": version, "n": name, "t": datetime.utcnow()},
+            )
+        applied.append(version)
+    return applied
+
+
+def hot_queries() -> Dict[str, object]:
+    """The scheduler and queue queries whose plans must stay index-backed."""
+    cutoff = datetime.utcnow() - timedelta(hours=24)
+    return {
+        "reply dedup": select(Conversation.id)
+        .where(Conversation.lead_id == 1, Conversation.role == "user", Conversation.content == "hi")
+        .order_by(Conversation.timestamp.desc())
+        .limit(1),
+        "conversation context": select(Conversation)
+        .where(Conversation.lead_id == 1)
+        .order_by(Conversation.timestamp.desc(), Conversation.id.desc())
+        .limit(20),
+        "sent-lead allowlist": select(Lead.profile_url).where(Lead.message_sent == True),  # noqa: E712
+        "due follow-ups (never contacted)": select(Lead.id)
+        .where(
+            Lead.message_sent == True,  # noqa: E712
+            Lead.reply_status == "not replied",
+            Lead.last_contact_time.is_(None),
+        )
+        .order_by(Lead.id)
+        .limit(50),
+        "due follow-ups (contacted before cutoff)": select(Lead.id)
+        .where(
+            Lead.message_sent == True,  # noqa: E712
+            Lead.reply_status == "not replied",
+            Lead.last_contact_time < cutoff,
+        )
+        .order_by(Lead.last_contact_time, Lead.id)
+        .limit(50),
+        "lead index refresh": select(Lead.id, Lead.name, Lead.profile_url).where(Lead.updated_at >= cutoff),
+        "dashboard page": select(Lead.id)
+        .where(Lead.created_at < cutoff)
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+        .limit(50),
+        "dashboard page by reply status": select(Lead.id)
+        .where(Lead.reply_status == "replied")
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+        .limit(50),
+        "send queue claim": select(SendJobItem.id)
+        .where(SendJobItem.status == "pending")
+        .order_by(SendJobItem.job_id.asc(), SendJobItem.id.asc())
+        .limit(1),
+        "send queue expired leases": select(SendJobItem.id)
+        .where(SendJobItem.status == "running", SendJobItem.lease_until < cutoff)
+        .order_by(SendJobItem.job_id.asc(), SendJobItem.id.asc())
+        .limit(1),
+    }
+
+
+_FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+
+
+def check_query_plans(engine: Engine) -> List[Dict[str, object]]:
+    """EXPLAIN QUERY PLAN each hot query and flag full table scans."""
+    results = []
+    with engine.connect() as conn:
+        for name, stmt in hot_queries().items():
+            sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+            results.append({
+                "query": name,
+                "plan": plan,
+                "full_scan": any(_FULL_SCAN.match(step.strip()) for step in plan),
+            })
+    return results
@@ -6,12 +6,30 @@ from sqlalchemy import func
 db = SQLAlchemy()
 
 
+def _profile_key(context):
+    # Deferred import: lead_index imports the models
+    from src.services.lead_index import normalize_profile_url
+
+    return normalize_profile_url(context.get_current_parameters().get("profile_url"))
+
+
 class Lead(db.Model):
     __tablename__ = "leads"
+    # Keep in sync with the migrations in src/migrations.py
+    __table_args__ = (
+        db.Index("ix_leads_followup", "message_sent", "reply_status", "last_contact_time"),
+        db.Index("ix_leads_updated_at", "updated_at"),
+        db.Index("ix_leads_created_at", "created_at"),
+        db.Index("ix_leads_reply_created", "reply_status", "created_at"),
+        db.Index("ix_leads_interest_created", "interest_level", "created_at"),
+        db.Index("ix_leads_sent_created", "message_sent", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     profile_url = db.Column(db.String(512), nullable=False, unique=True)
+    # Canonical form of profile_url (normalize_profile_url): one lead per LinkedIn profile
+    profile_key = db.Column(db.String(512), unique=True, index=True, default=_profile_key)
     role = db.Column(db.String(255))
     company = db.Column(db.String(255))
     email = db.Column(db.String(255))
@@ -33,6 +51,10 @@ class Lead(db.Model):
 
 class Conversation(db.Model):
     __tablename__ = "conversations"
+    __table_args__ = (
+        db.Index("ix_conversations_lead_ts", "lead_id", "timestamp"),
+        db.Index("ix_conversations_lead_role_ts", "lead_id", "role", "timestamp"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     lead_id = db.Column(db.Integer, db.ForeignKey("leads.id", ondelete="CASCADE"), nullable=False)
@@ -41,3 +63,76 @@ class Conversation(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
 
+class ConversationSummary(db.Model):
+    """Rolling summary of the turns that have scrolled out of a lead's context tail."""
+
+    __tablename__ = "conversation_summaries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    lead_id = db.Column(db.Integer, db.ForeignKey("leads.id", ondelete="CASCADE"), nullable=False, unique=True)
+    summary = db.Column(db.Text, default="", nullable=False)
+    # (timestamp, id) of the newest Conversation row folded into the summary
+    covered_until = db.Column(db.DateTime)
+    covered_id = db.Column(db.Integer, default=0, nullable=False)
+    turns = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class SendJob(db.Model):
+    __tablename__ = "send_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), default="first_message", nullable=False)
+    status = db.Column(db.String(32), default="queued", nullable=False)  # queued/running/done
+    total = db.Column(db.Integer, default=0, nullable=False)
+    sent = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    items = db.relationship("SendJobItem", backref="job", lazy=True, cascade="all, delete-orphan")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class SendJobItem(db.Model):
+    __tablename__ = "send_job_items"
+    __table_args__ = (db.Index("ix_send_job_items_claim", "status", "job_id", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey("send_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    lead_id = db.Column(db.Integer, db.ForeignKey("leads.id", ondelete="CASCADE"), nullable=False)
+    status = db.Column(db.String(32), default="pending", nullable=False, index=True)  # pending/running/sent/failed/skipped
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text)
+    # Worker holding a "running" item and until when; an expired lease may be reclaimed
+    claimed_by = db.Column(db.String(128))
+    lease_until = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class InboxThread(db.Model):
+    """Last-seen state of a conversation card in the LinkedIn inbox list."""
+
+    __tablename__ = "inbox_threads"
+
+    id = db.Column(db.Integer, primary_key=True)
+    thread_key = db.Column(db.String(512), nullable=False, unique=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    preview = db.Column(db.Text)
+    last_activity = db.Column(db.String(64))
+    unread = db.Column(db.Boolean, default=False, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from src.services.rate_limit import TokenBucket
+
+
+# Lower runs first: answering a live conversation beats cold outreach
+PRIORITIES = {"login": 0, "inbox": 0, "reply": 0, "followup": 1, "first_message": 2}
+
+ACCOUNT_WIDE = "*"
+
+
+class ActionThrottled(Exception):
+    """Raised when an action could not be admitted within its timeout.
+
+    ``retry_after`` is how long its rate budget still needs to refill, or 0
+    when it only waited for a free browser.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    seq: int
+    kind: str = field(compare=False)
+    account: str = field(compare=False)
+    enqueued: float = field(compare=False, default_factory=time.monotonic)
+
+
+@dataclass
+class ActionLimit:
+    per_hour: float
+    per_day: float
+
+
+class ActionScheduler:
+    """Admits LinkedIn browser actions in priority order under rate limits.
+
+    Callers run their action inside ``slot(kind)``. At most ``slots``
+    actions (one per pooled browser) hold a slot at once, and a free slot
+    goes to the highest-priority waiter whose hourly and daily token
+    buckets, for its action type and its account, have a token.
+    The action runs on the caller's thread inside ``bot.session()``, so
+    actions that rely on page state from an earlier call (a reply after
+    the inbox read opened the thread) keep their browser. A slot taken
+    while the thread already holds one only spends rate tokens.
+    """
+
+    def __init__(self, bot, slots: int = 1, limits: Optional[Dict[str, ActionLimit]] = None,
+                 account_limit: Optional[ActionLimit] = None, burst: float = 3, window: int = 500):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.bot = bot
+        self.slots = max(1, slots)
+        self.limits = limits or {}
+        self.account_limit = account_limit
+        self.burst = burst
+        self._cond = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._busy = 0
+        self._local = threading.local()
+        self._buckets: Dict[Tuple[str, str], Tuple[TokenBucket, TokenBucket]] = {}
+        self._waits: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._admitted: Dict[str, int] = defaultdict(int)
+        self._throttled: Dict[str, int] = defaultdict(int)
+
+    def _limits_for(self, account: str, kind: str) -> List[Tuple[TokenBucket, TokenBucket]]:
+        # Only rate-limited kinds (outbound messages) count towards the account budget;
+        # reading the inbox does not
+        if kind not in self.limits:
+            return []
+        keys = [((account, kind), self.limits[kind])]
+        if self.account_limit is not None:
+            keys.append(((account, ACCOUNT_WIDE), self.account_limit))
+        buckets = []
+        for key, limit in keys:
+            if key not in self._buckets:
+                # Hourly: small bursts at the hourly rate. Daily: the whole day's
+                # budget up front, refilled over 24h.
+                self._buckets[key] = (
+                    TokenBucket(rate=limit.per_hour / 3600.0, capacity=min(self.burst, limit.per_hour)),
+                    TokenBucket(rate=limit.per_day / 86400.0, capacity=limit.per_day),
+                )
+            buckets.append(self._buckets[key])
+        return buckets
+
+    def _token_wait(self, ticket: _Ticket) -> float:
+        return max(
+            (bucket.wait_time() for pair in self._limits_for(ticket.account, ticket.kind) for bucket in pair),
+            default=0.0,
+        )
+
+    def _spend(self, ticket: _Ticket) -> None:
+        for pair in self._limits_for(ticket.account, ticket.kind):
+            for bucket in pair:
+                bucket.try_acquire()
+
+    def _next_admissible(self) -> Tuple[Optional[_Ticket], float]:
+        """Best waiter that can run now, else the shortest token wait among them."""
+        soonest = float("inf")
+        for ticket in sorted(self._waiting):
+            wait = self._token_wait(ticket)
+            if wait <= 0:
+                return ticket, 0.0
+            soonest = min(soonest, wait)
+        return None, soonest
+
+    def record_prior(self, used: int, account: str = "default") -> None:
+        """Charge actions sent before a restart against the account's daily budget."""
+        if self.account_limit is None or used <= 0:
+            return
+        with self._cond:
+            if not self.limits:
+                return
+            self._limits_for(account, next(iter(self.limits)))
+            daily = self._buckets[(account, ACCOUNT_WIDE)][1]
+            daily.try_acquire(min(used, daily.available()))
+
+    @contextmanager
+    def slot(self, kind: str, account: str = "default", timeout: Optional[float] = None) -> Iterator:
+        """Wait for this action's turn, then hold a browser session for the block."""
+        nested = getattr(self._local, "depth", 0) > 0
+        ticket = _Ticket(PRIORITIES.get(kind, max(PRIORITIES.values()) + 1), next(self._seq), kind, account)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    wait = self._token_wait(ticket)
+                    if nested and wait <= 0:
+                        break
+                    if not nested and self._busy < self.slots:
+                        best, soonest = self._next_admissible()
+                        if best is ticket:
+                            break
+                        wait = soonest
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._throttled[kind] += 1
+                        raise ActionThrottled(
+                            f"{kind} action not admitted within {timeout:g}s", retry_after=self._token_wait(ticket)
+                        )
+                    # Token refills are not signalled, so re-check at least once a second
+                    pause = [1.0, wait] if wait > 0 else [1.0]
+                    if remaining is not None:
+                        pause.append(remaining)
+                    self._cond.wait(min(pause))
+                self._spend(ticket)
+                if not nested:
+                    self._busy += 1
+                self._admitted[kind] += 1
+                self._waits[kind].append(time.monotonic() - ticket.enqueued)
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            with self.bot.session():
+                yield
+        finally:
+            self._local.depth -= 1
+            if not nested:
+                with self._cond:
+                    self._busy -= 1
+                    self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            depth: Dict[str, int] = defaultdict(int)
+            for ticket in self._waiting:
+                depth[ticket.kind] += 1
+            kinds = set(PRIORITIES) | set(self._admitted) | set(depth)
+            out = {"busy": self._busy, "slots": self.slots, "actions": {}}
+            for kind in sorted(kinds, key=lambda k: (PRIORITIES.get(k, 99), k)):
+                waits = sorted(self._waits[kind])
+                out["actions"][kind] = {
+                    "queued": depth[kind],
+                    "admitted": self._admitted[kind],
+                    "throttled": self._throttled[kind],
+                    "wait_s_p50": round(waits[len(waits) // 2], 3) if waits else None,
+                    "wait_s_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                }
+            out["tokens"] = {
+                f"{account}/{kind}": {"hour": round(hourly.available(), 2), "day": round(daily.available(), 2)}
+                for (account, kind), (hourly, daily) in self._buckets.items()
+            }
+            return out
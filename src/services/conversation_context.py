@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+from src.models import Conversation, ConversationSummary, Lead, db
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose; close enough for budgeting
+    return (len(text) + 3) // 4
+
+
+def _clip(text: str, tokens: int, keep_end: bool = False) -> str:
+    limit = max(tokens, 0) * 4
+    if len(text) <= limit:
+        return text
+    if limit < 2:
+        return ""
+    return "…" + text[-(limit - 1):] if keep_end else text[:limit - 1] + "…"
+
+
+def _format(m) -> str:
+    return f"[{m.timestamp.isoformat()}] {m.role}: {m.content}"
+
+
+class ConversationContext:
+    """Prompt context for a lead: a rolling summary plus the most recent turns.
+
+    Only the last ``tail_turns`` rows are read (a LIMIT-ed descending index
+    scan). Turns that fall out of the tail are folded into a persisted
+    ConversationSummary a batch at a time by ``refresh``, which runs after a
+    turn is saved. ``build`` only reads, so prompt construction never calls
+    the model or commits, and its cost does not grow with the length of the
+    thread. The result always fits ``token_budget``.
+    """
+
+    def __init__(self, summarize: Optional[Callable[[str, List[str], int], str]] = None,
+                 token_budget: int = 1500, tail_turns: int = 20, summary_tokens: int = 300,
+                 summary_batch: int = 50):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.tail_turns = tail_turns
+        self.summary_tokens = min(summary_tokens, token_budget // 2)
+        self.summary_batch = summary_batch
+
+    def build(self, lead: Lead) -> str:
+        """Needs an app context; read-only."""
+        tail = (
+            Conversation.query.filter_by(lead_id=lead.id)
+            .order_by(Conversation.timestamp.desc(), Conversation.id.desc())
+            .limit(self.tail_turns)
+            .all()
+        )
+        summary = ""
+        if len(tail) == self.tail_turns:
+            row = ConversationSummary.query.filter_by(lead_id=lead.id).first()
+            summary = row.summary if row is not None else ""
+
+        budget = self.token_budget
+        parts: List[str] = []
+        if summary:
+            header = f"Summary of earlier conversation:\n{_clip(summary, self.summary_tokens)}"
+            parts.append(header)
+            budget -= estimate_tokens(header)
+        lines: List[str] = []
+        for m in tail:  # newest first, so the oldest turns are the ones dropped
+            line = _format(m)
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                if not lines:
+                    lines.append(_clip(line, budget - 1))
+                break
+            lines.append(line)
+            budget -= cost
+        parts.append("\n".join(reversed(lines)))
+        return "\n".join(p for p in parts if p)
+
+    def refresh(self, lead_id: int) -> None:
+        """Fold turns older than the tail into the stored summary; needs an app context, commits."""
+        tail_start = (
+            db.session.query(Conversation.timestamp, Conversation.id)
+            .filter(Conversation.lead_id == lead_id)
+            .order_by(Conversation.timestamp.desc(), Conversation.id.desc())
+            .offset(self.tail_turns - 1)
+            .first()
+        )
+        if tail_start is None:
+            return
+        try:
+            self._update_summary(lead_id, (tail_start.timestamp, tail_start.id))
+        except Exception as exc:
+            db.session.rollback()
+            self.logger.warning("Summary refresh failed for lead %s: %s", lead_id, exc)
+
+    def _update_summary(self, lead_id: int, tail_start: Tuple[datetime, int]) -> str:
+        row = ConversationSummary.query.filter_by(lead_id=lead_id).first()
+        query = Conversation.query.filter(
+            Conversation.lead_id == lead_id,
+            or_(
+                Conversation.timestamp < tail_start[0],
+                and_(Conversation.timestamp == tail_start[0], Conversation.id < tail_start[1]),
+            ),
+        )
+        if row is not None and row.covered_until is not None:
+            query = query.filter(
+                or_(
+                    Conversation.timestamp > row.covered_until,
+                    and_(Conversation.timestamp == row.covered_until, Conversation.id > row.covered_id),
+                )
+            )
+        # Newest pending turns only: a backlog longer than one batch (an old
+        # thread seen for the first time) could not fit the summary budget anyway
+        pending = (
+            query.order_by(Conversation.timestamp.desc(), Conversation.id.desc())
+            .limit(self.summary_batch)
+            .all()
+        )[::-1]
+        previous = row.summary if row is not None else ""
+        if not pending:
+            return previous
+
+        summary = self._fold(previous, pending)
+        if row is None:
+            row = ConversationSummary(lead_id=lead_id)
+            db.session.add(row)
+        row.summary = summary
+        row.covered_until = pending[-1].timestamp
+        row.covered_id = pending[-1].id
+        row.turns = (row.turns or 0) + len(pending)
+        db.session.commit()
+        return summary
+
+    def _fold(self, previous: str, turns: Sequence[Conversation]) -> str:
+        lines = [_format(m) for m in turns]
+        if self.summarize is not None:
+            try:
+                text = (self.summarize(previous, lines, self.summary_tokens) or "").strip()
+                if text:
+                    return _clip(text, self.summary_tokens)
+            except Exception as exc:
+                self.logger.warning("Summary update failed; keeping an extractive summary: %s", exc)
+        # Without a model, keep the newest older turns verbatim, clipped to budget
+        per_line = max(self.summary_tokens // max(len(lines), 1), 16)
+        merged = "\n".join(filter(None, [previous] + [_clip(line, per_line) for line in lines]))
+        return _clip(merged, self.summary_tokens, keep_end=True)
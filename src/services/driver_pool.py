@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+@dataclass
+class PooledDriver:
+    slot: int
+    driver: Any
+    created_at: float = field(default_factory=time.time)
+    uses: int = 0
+
+
+class DriverPool:
+    """Bounded pool of WebDriver sessions with checkout/checkin semantics.
+
+    Sessions are launched lazily, one per slot, so slot ``i`` always maps to
+    the same browser profile. A session that fails its health check on
+    checkout (or is checked in as broken) is quit and relaunched.
+    """
+
+    def __init__(self, factory: Callable[[int], Any], size: int = 1,
+                 health_check: Optional[Callable[[Any], bool]] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.factory = factory
+        self.size = max(1, size)
+        self.health_check = health_check or _default_health_check
+        self._cond = threading.Condition()
+        self._idle: List[PooledDriver] = []
+        self._busy: Dict[int, PooledDriver] = {}
+        self._free_slots: List[int] = list(range(self.size))
+
+    def checkout(self, timeout: Optional[float] = None) -> PooledDriver:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._free_slots:
+                    slot = self._free_slots.pop(0)
+                    pooled = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolExhausted(f"No browser session free after {timeout}s")
+                self._cond.wait(remaining)
+
+        if pooled is not None and not self._is_healthy(pooled):
+            self.logger.warning("Browser session %d failed health check; relaunching", pooled.slot)
+            self._quit(pooled)
+            slot, pooled = pooled.slot, None
+        if pooled is None:
+            try:
+                pooled = PooledDriver(slot=slot, driver=self.factory(slot))
+            except Exception:
+                with self._cond:
+                    self._free_slots.append(slot)
+                    self._cond.notify()
+                raise
+
+        pooled.uses += 1
+        with self._cond:
+            self._busy[pooled.slot] = pooled
+        return pooled
+
+    def checkin(self, pooled: PooledDriver, broken: bool = False) -> None:
+        if broken:
+            self._quit(pooled)
+        with self._cond:
+            self._busy.pop(pooled.slot, None)
+            if broken:
+                self._free_slots.append(pooled.slot)
+            else:
+                self._idle.append(pooled)
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "size": self.size,
+                "busy": len(self._busy),
+                "idle": len(self._idle),
+                "unstarted": len(self._free_slots),
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            sessions = self._idle + list(self._busy.values())
+            self._idle = []
+            self._busy = {}
+            self._free_slots = list(range(self.size))
+        for pooled in sessions:
+            self._quit(pooled)
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        try:
+            return bool(self.health_check(pooled.driver))
+        except Exception:
+            return False
+
+    def _quit(self, pooled: PooledDriver) -> None:
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+
+def _default_health_check(driver: Any) -> bool:
+    # Any round trip to chromedriver fails fast once the browser is gone
+    return driver.execute_script("return document.readyState") is not None
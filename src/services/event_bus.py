@@ -1,50 +1,113 @@
 from __future__ import annotations
 
-import json
+import itertools
 import threading
 import time
 from collections import deque
-from queue import Queue
-from typing import Deque, Dict, List
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class Subscription:
+    """A reader's position in the bus; holds a cursor, never a copy of events."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, bus: "EventBus", cursor: int):
+        self.id = next(self._ids)
+        self.bus = bus
+        self.cursor = cursor
+        self.missed = 0
+
+    def poll(self, timeout: Optional[float] = None, limit: int = 500) -> Tuple[List[Dict], int]:
+        """Wait up to ``timeout`` for events after the cursor.
+
+        Returns the events plus how many were lost because this reader fell
+        further behind than the ring buffer holds.
+        """
+        self.bus.wait_for(self.cursor, timeout)
+        events, missed, self.cursor = self.bus.read_since(self.cursor, limit)
+        self.missed += missed
+        return events, missed
+
+    @property
+    def lag(self) -> int:
+        return max(self.bus.last_seq - self.cursor, 0)
 
 
 class EventBus:
-    def __init__(self, history_size: int = 200):
-        self._subscribers: List[Queue] = []
-        self._lock = threading.Lock()
-        self._history: Deque[Dict] = deque(maxlen=history_size)
+    """Single shared ring buffer of events with monotonically increasing ``seq``.
+
+    Emitting appends once regardless of how many readers exist; each
+    Subscription only tracks the last seq it has seen.
+    """
+
+    def __init__(self, history_size: int = 1000):
+        self._buffer: Deque[Dict] = deque(maxlen=history_size)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._subscribers: Dict[int, Subscription] = {}
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
 
     def emit(self, level: str, message: str, extra: Dict | None = None) -> None:
-        event = {
-            "ts": time.time(),
-            "level": level,
-            "message": message,
-            "extra": extra or {},
-        }
-        with self._lock:
-            self._history.append(event)
-            for q in list(self._subscribers):
-                try:
-                    q.put_nowait(event)
-                except Exception:
-                    pass
-
-    def subscribe(self) -> Queue:
-        q: Queue = Queue(maxsize=100)
-        with self._lock:
-            self._subscribers.append(q)
-        return q
-
-    def unsubscribe(self, q: Queue) -> None:
-        with self._lock:
-            if q in self._subscribers:
-                self._subscribers.remove(q)
+        with self._cond:
+            self._seq += 1
+            self._buffer.append({
+                "seq": self._seq,
+                "ts": time.time(),
+                "level": level,
+                "message": message,
+                "extra": extra or {},
+            })
+            self._cond.notify_all()
 
-    def get_history(self) -> List[Dict]:
-        with self._lock:
-            return list(self._history)
+    def read_since(self, cursor: int, limit: Optional[int] = None) -> Tuple[List[Dict], int, int]:
+        """Events with seq > cursor, the count lost to overwrite, and the new cursor."""
+        with self._cond:
+            if not self._buffer or cursor >= self._seq:
+                return [], 0, cursor
+            oldest = self._buffer[0]["seq"]
+            missed = max(oldest - cursor - 1, 0)
+            start = max(cursor + 1 - oldest, 0)
+            stop = len(self._buffer) if limit is None else min(len(self._buffer), start + limit)
+            events = list(itertools.islice(self._buffer, start, stop))
+            return events, missed, events[-1]["seq"] if events else cursor
 
+    def wait_for(self, cursor: int, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq > cursor, timeout)
 
-bus = EventBus()
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Start reading after ``last_event_id``, or from the oldest buffered event."""
+        with self._cond:
+            if last_event_id is None:
+                cursor = self._buffer[0]["seq"] - 1 if self._buffer else self._seq
+            else:
+                # A stale id from before a restart is ahead of the new sequence
+                cursor = last_event_id if last_event_id <= self._seq else 0
+            sub = Subscription(self, cursor)
+            self._subscribers[sub.id] = sub
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._cond:
+            self._subscribers.pop(sub.id, None)
 
+    def get_history(self) -> List[Dict]:
+        with self._cond:
+            return list(self._buffer)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            subs = list(self._subscribers.values())
+            return {
+                "last_seq": self._seq,
+                "buffered": len(self._buffer),
+                "capacity": self._buffer.maxlen,
+                "subscribers": [{"id": s.id, "lag": s.lag, "missed": s.missed} for s in subs],
+            }
 
+
+bus = EventBus()
@@ -1,82 +1,280 @@
 from __future__ import annotations
 
+import csv
+import io
 import os
 import tempfile
+import time
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from io import BytesIO
-from typing import BinaryIO
+from typing import BinaryIO, Iterator
 
 import pandas as pd
+from openpyxl import Workbook, load_workbook
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from src.models import db, Lead
+from src.services.event_bus import bus
+from src.services.lead_index import normalize_profile_url
 
 
 REQUIRED_COLUMNS = ["name", "profile url", "role", "company", "email", "phone"]
 
+# Sheet column -> Lead attribute
+FIELD_MAP = {
+    "name": "name",
+    "profile url": "profile_url",
+    "role": "role",
+    "company": "company",
+    "email": "email",
+    "phone": "phone",
+}
+
+IMPORT_CHUNK_ROWS = 5000
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
 
 def _normalize_columns(columns):
     return [str(c).strip().lower() for c in columns]
 
 
-def import_leads_from_excel(file: BinaryIO) -> int:
-    df = pd.read_excel(file)
-    cols = _normalize_columns(df.columns)
-    df.columns = cols
+def _check_columns(cols) -> None:
     missing = [c for c in REQUIRED_COLUMNS if c not in cols]
     if missing:
         raise ValueError(f"Missing required columns: {', '.join(missing)}")
 
-    count = 0
-    for _, row in df.iterrows():
-        profile_url = str(row.get("profile url", "")).strip()
-        if not profile_url:
+
+def _iter_frames(file: BinaryIO, filename: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Yield the sheet in DataFrame chunks without loading large files whole."""
+    name = (filename or getattr(file, "filename", "") or "").lower()
+    if name.endswith(".csv"):
+        for chunk in pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+            yield chunk
+        return
+    if name.endswith(".xls"):
+        # Legacy format: openpyxl cannot stream it
+        yield pd.read_excel(file, dtype=str)
+        return
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        chunk, yielded = [], False
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk, yielded = [], True
+        if chunk or not yielded:
+            # Header-only sheets still go through the column check
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def _clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = _normalize_columns(df.columns)
+    _check_columns(df.columns)
+    cleaned = pd.DataFrame(index=df.index)
+    for column, attr in FIELD_MAP.items():
+        values = df[column].astype("string").str.strip()
+        cleaned[attr] = values.mask(values.isna() | values.isin(["", "nan", "None"]))
+    return cleaned
+
+
+def import_leads_from_excel(file: BinaryIO, filename: str = "", chunk_rows: int = IMPORT_CHUNK_ROWS) -> ImportResult:
+    """Upsert leads from an .xlsx/.xls/.csv upload in chunks.
+
+    Rows are normalized with pandas, a profile URL repeated anywhere in the
+    file (compared in canonical form) keeps its first occurrence and the
+    repeats count as skipped, and each chunk is written with one
+    INSERT ... ON CONFLICT(profile_key) DO UPDATE executemany. Blank cells
+    never overwrite existing values.
+    """
+    started = time.perf_counter()
+    result = ImportResult()
+    table = Lead.__table__
+    insert = sqlite_insert(table)
+    # Keyed on the canonical URL, so another spelling of a stored profile updates it
+    upsert = insert.on_conflict_do_update(
+        index_elements=[table.c.profile_key],
+        set_={
+            "name": func.coalesce(func.nullif(insert.excluded.name, ""), table.c.name),
+            "role": func.coalesce(insert.excluded.role, table.c.role),
+            "company": func.coalesce(insert.excluded.company, table.c.company),
+            "email": func.coalesce(insert.excluded.email, table.c.email),
+            "phone": func.coalesce(insert.excluded.phone, table.c.phone),
+            "updated_at": insert.excluded.updated_at,
+        },
+    )
+
+    seen = set()  # canonical URLs already written by earlier chunks
+    for frame in _iter_frames(file, filename, chunk_rows):
+        result.rows += len(frame)
+        cleaned = _clean_frame(frame)
+        cleaned = cleaned[cleaned["profile_url"].notna()]
+        keys = cleaned["profile_url"].map(normalize_profile_url)
+        deduped = cleaned[~keys.duplicated(keep="first") & ~keys.isin(seen)]
+        seen.update(keys)
+        result.skipped += len(frame) - len(deduped)
+        if deduped.empty:
             continue
-        lead = Lead.query.filter_by(profile_url=profile_url).first()
-        if not lead:
-            lead = Lead(
-                name=str(row.get("name", "")).strip() or "",
-                profile_url=profile_url,
-                role=str(row.get("role", "")).strip() or None,
-                company=str(row.get("company", "")).strip() or None,
-                email=str(row.get("email", "")).strip() or None,
-                phone=str(row.get("phone", "")).strip() or None,
+
+        chunk_keys = keys[deduped.index].tolist()
+        existing = {
+            key for (key,) in db.session.query(Lead.profile_key).filter(Lead.profile_key.in_(chunk_keys))
+        }
+        now = datetime.utcnow()
+        records = deduped.astype(object).where(deduped.notna(), None).to_dict("records")
+        for record, key in zip(records, chunk_keys):
+            record["name"] = record["name"] or ""
+            record.update(
+                profile_key=key,
+                message_sent=False,
+                reply_status="not replied",
+                interest_level="unsure",
+                follow_up_taken=False,
+                created_at=now,
+                updated_at=now,
             )
-            db.session.add(lead)
-            count += 1
-        else:
-            # Update fields if provided
-            lead.name = str(row.get("name", lead.name) or lead.name)
-            lead.role = str(row.get("role", lead.role) or lead.role)
-            lead.company = str(row.get("company", lead.company) or lead.company)
-            lead.email = str(row.get("email", lead.email) or lead.email)
-            lead.phone = str(row.get("phone", lead.phone) or lead.phone)
-    db.session.commit()
-    return count
-
-
-def export_leads_to_excel() -> str:
-    leads = Lead.query.all()
-    rows = []
-    for l in leads:
-        rows.append(
-            {
-                "name": l.name,
-                "profile url": l.profile_url,
-                "role": l.role,
-                "company": l.company,
-                "email": l.email,
-                "phone": l.phone,
-                "message sent": "yes" if l.message_sent else "no",
-                "reply status": l.reply_status,
-                "interest level": l.interest_level,
-                "follow-up taken": "yes" if l.follow_up_taken else "no",
-                "last contact time": l.last_contact_time.isoformat() if l.last_contact_time else "",
-            }
+        db.session.execute(upsert, records)
+        db.session.commit()
+        result.updated += len(existing)
+        result.inserted += len(records) - len(existing)
+
+    result.seconds = time.perf_counter() - started
+    bus.emit(
+        "success",
+        f"Imported {result.rows} rows: {result.inserted} new, {result.updated} updated, "
+        f"{result.skipped} skipped ({result.rows_per_sec:.0f} rows/s)",
+        {**asdict(result), "rows_per_sec": round(result.rows_per_sec, 1)},
+    )
+    return result
+
+
+EXPORT_COLUMNS = [
+    "name",
+    "profile url",
+    "role",
+    "company",
+    "email",
+    "phone",
+    "message sent",
+    "reply status",
+    "interest level",
+    "follow-up taken",
+    "last contact time",
+]
+
+EXPORT_BATCH_ROWS = 2000
+
+
+def _iter_export_rows(batch_size: int = EXPORT_BATCH_ROWS) -> Iterator[list]:
+    # Column-only select streamed in batches: no ORM objects, memory stays flat
+    query = (
+        db.session.query(
+            Lead.name,
+            Lead.profile_url,
+            Lead.role,
+            Lead.company,
+            Lead.email,
+            Lead.phone,
+            Lead.message_sent,
+            Lead.reply_status,
+            Lead.interest_level,
+            Lead.follow_up_taken,
+            Lead.last_contact_time,
         )
-    df = pd.DataFrame(rows)
-    tmpdir = tempfile.gettempdir()
-    path = os.path.join(tmpdir, f"leads_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.xlsx")
-    df.to_excel(path, index=False)
+        .order_by(Lead.id.asc())
+        .execution_options(yield_per=batch_size)
+    )
+    for r in query:
+        yield [
+            r.name,
+            r.profile_url,
+            r.role,
+            r.company,
+            r.email,
+            r.phone,
+            "yes" if r.message_sent else "no",
+            r.reply_status,
+            r.interest_level,
+            "yes" if r.follow_up_taken else "no",
+            r.last_contact_time.isoformat() if r.last_contact_time else "",
+        ]
+
+
+def export_filename(extension: str) -> str:
+    return f"leads_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def export_leads_to_excel(batch_size: int = EXPORT_BATCH_ROWS) -> str:
+    """Write all leads to a temp .xlsx with openpyxl write-only mode and return its path.
+
+    Memory stays flat, but the whole workbook is written before it can be
+    sent, so time to first byte still grows with the table; ``iter_leads_csv``
+    streams.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("leads")
+    sheet.append(EXPORT_COLUMNS)
+    for row in _iter_export_rows(batch_size):
+        sheet.append(row)
+    # A unique file per export: concurrent exports must not share (and delete) one path
+    fd, path = tempfile.mkstemp(prefix="leads_export_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+    except Exception:
+        os.remove(path)
+        raise
     return path
 
 
+def iter_file_and_remove(path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Stream a temp export file in chunks and delete it once fully sent or aborted."""
+    try:
+        with open(path, "rb") as fh:
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def iter_leads_csv(batch_size: int = EXPORT_BATCH_ROWS) -> Iterator[str]:
+    """Yield the lead export as CSV text, one chunk per ``batch_size`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in _iter_export_rows(batch_size):
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
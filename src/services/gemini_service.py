@@ -1,50 +1,245 @@
 from __future__ import annotations
 
+import json
 import logging
-from typing import List
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, TypeVar
 
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 
-from src.models import Conversation, Lead, db
+from src.models import Lead
+from src.services.conversation_context import ConversationContext
 from src.services.event_bus import bus
+from src.services.llm_cache import ResponseCache
+from src.services.metrics import span
+from src.services.rate_limit import TokenBucket
+
+
+T = TypeVar("T")
+
+# Errors worth retrying: quota (429) and transient backend unavailability
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+)
+
+INTEREST_LEVELS = ("interested", "not interested", "unsure")
+MAX_REPLY_CHARS = 1000
+
+# Schema-constrained output for the single-call classify-and-reply mode
+REPLY_DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "interest": {"type": "string", "enum": list(INTEREST_LEVELS)},
+        "action": {"type": "string"},
+        "summary": {"type": "string"},
+        "reply": {"type": "string"},
+    },
+    "required": ["interest", "action", "summary", "reply"],
+}
+
+
+@dataclass
+class ReplyDecision:
+    interest: str
+    action: str
+    summary: str
+    reply: str
+    mode: str = "combined"  # combined | separate | fallback
+
+
+def parse_classification(text: str) -> Dict[str, str]:
+    """Validate a classification JSON object; raises ValueError on anything off-schema."""
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"not JSON: {exc}") from exc
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    interest = data.get("interest")
+    if not isinstance(interest, str) or interest.strip().lower() not in INTEREST_LEVELS:
+        raise ValueError(f"invalid interest: {interest!r}")
+    result = {"interest": interest.strip().lower()}
+    for key in ("action", "summary"):
+        value = data.get(key, "")
+        if not isinstance(value, str):
+            raise ValueError(f"{key} must be a string")
+        result[key] = value.strip()
+    return result
+
+
+def parse_reply_decision(text: str) -> ReplyDecision:
+    """Validate a combined classify-and-reply response strictly."""
+    data = parse_classification(text)
+    reply = json.loads(text).get("reply")
+    if not isinstance(reply, str) or not reply.strip():
+        raise ValueError("reply must be a non-empty string")
+    if len(reply) > MAX_REPLY_CHARS:
+        raise ValueError(f"reply too long ({len(reply)} chars)")
+    return ReplyDecision(reply=reply.strip(), **data)
+
+
+class CallMetrics:
+    """Per call-kind counters and recent latencies for model calls."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self._window))
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "cache_hits": 0, "errors": 0, "parse_failures": 0})
+
+    def record(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._counts[kind]["calls"] += 1
+            self._latencies[kind].append(seconds)
+
+    def incr(self, kind: str, counter: str) -> None:
+        with self._lock:
+            self._counts[kind][counter] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for kind, counts in self._counts.items():
+                samples = sorted(self._latencies[kind])
+                entry: Dict[str, Any] = dict(counts)
+                if samples:
+                    entry["latency_ms"] = {
+                        "mean": round(1000 * sum(samples) / len(samples), 1),
+                        "p50": round(1000 * samples[len(samples) // 2], 1),
+                        "p95": round(1000 * samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+                    }
+                out[kind] = entry
+            return out
 
 
 class GeminiClient:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, requests_per_minute: int = 15, max_concurrency: int = 4,
+                 max_retries: int = 4, backoff_base: float = 2.0, backoff_max: float = 60.0,
+                 model_name: str = "gemini-1.5-flash", cache: Optional[ResponseCache] = None,
+                 context_token_budget: int = 1500, context_tail_turns: int = 20, summary_tokens: int = 300,
+                 reply_mode: str = "combined"):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.api_key = api_key
+        self.model_name = model_name
+        self.cache = cache
+        self.reply_mode = reply_mode
+        self.metrics = CallMetrics()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = TokenBucket.per_minute(requests_per_minute, burst=max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="gemini")
         if not api_key:
             self.logger.warning("GEMINI_API_KEY missing; AI features disabled until configured.")
             self.model = None
         else:
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel("gemini-1.5-flash")
+            self.model = genai.GenerativeModel(model_name)
+        self.context = ConversationContext(
+            summarize=self._summarize if self.model else None,
+            token_budget=context_token_budget,
+            tail_turns=context_tail_turns,
+            summary_tokens=summary_tokens,
+        )
+
+    def _generate(self, prompt: str, kind: str = "generate", generation_config: Optional[dict] = None,
+                  validate: Optional[Callable[[str], Any]] = None) -> str:
+        """Cached, rate-limited ``generate_content`` with exponential backoff on 429s.
+
+        ``validate`` runs before caching, so a response it rejects (by raising
+        ValueError) is never served from the cache later.
+        """
+        # Structured calls get their own cache namespace: same prompt, different output shape
+        cache_model = f"{self.model_name}:json" if generation_config else self.model_name
+        if self.cache is not None:
+            cached = self.cache.get(cache_model, prompt)
+            if cached is not None:
+                self.metrics.incr(kind, "cache_hits")
+                return cached
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                with span("gemini_call", kind):
+                    text = self.model.generate_content(prompt, generation_config=generation_config).text
+                self.metrics.record(kind, time.perf_counter() - started)
+                break
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.metrics.incr(kind, "errors")
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                self.logger.info("Gemini rate limited (%s); retry %d in %.1fs", type(e).__name__, attempt, delay)
+                time.sleep(delay)
+            except Exception:
+                self.metrics.incr(kind, "errors")
+                raise
+        if validate is not None:
+            validate(text)
+        if text and self.cache is not None:
+            self.cache.put(cache_model, prompt, text)
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reply_mode": self.reply_mode,
+            "calls": self.metrics.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def _fan_out(self, calls: List[Callable[[], T]]) -> List[T]:
+        # Prompts are built on the caller's thread (they may touch the DB session);
+        # only the network-bound model calls run on the pool.
+        return list(self.executor.map(lambda call: call(), calls))
 
     def _conversation_context(self, lead: Lead) -> str:
-        messages: List[Conversation] = (
-            Conversation.query.filter_by(lead_id=lead.id).order_by(Conversation.timestamp.asc()).all()
+        return self.context.build(lead)
+
+    def refresh_context(self, lead_id: int) -> None:
+        """Update a lead's stored conversation summary; call after saving a turn, not while generating."""
+        self.context.refresh(lead_id)
+
+    def _summarize(self, previous: str, turns: List[str], max_tokens: int) -> str:
+        prompt = (
+            "Maintain a running summary of a LinkedIn sales conversation. Fold the new turns into the "
+            "existing summary, keeping facts, commitments, objections and the prospect's interest. "
+            f"Plain prose, at most {max_tokens * 3 // 4} words.\n"
+            f"Existing summary:\n{previous or '(none)'}\n"
+            "New turns:\n" + "\n".join(turns)
         )
-        history_lines = []
-        for m in messages:
-            history_lines.append(f"[{m.timestamp.isoformat()}] {m.role}: {m.content}")
-        return "\n".join(history_lines[-20:])  # cap context
+        return self._generate(prompt, kind="summary")
 
-    def generate_first_message(self, lead: Lead) -> str:
+    def _first_message_call(self, lead: Lead) -> Callable[[], str]:
+        name, role, company = lead.name, lead.role, lead.company
         prompt = (
             "You are a helpful SDR writing a concise, warm LinkedIn first message. "
             "Avoid sounding salesy; personalize using the info. 400 characters max.\n"
-            f"Lead: name={lead.name}, role={lead.role}, company={lead.company}."
+            f"Lead: name={name}, role={role}, company={company}."
         )
-        if not self.model:
-            return f"Hi {lead.name}, great to connect!"
-        try:
-            resp = self.model.generate_content(prompt)
-            return (resp.text or f"Hi {lead.name}, great to connect!").strip()
-        except Exception as e:
-            bus.emit("warning", f"Gemini first-message error; using fallback: {e}")
-            return f"Hi {lead.name}, great to connect! I enjoyed learning about your work at {lead.company or 'your company'}. If you’re open, I’d love to share a quick idea relevant to your role as {lead.role or 'your role'}."
 
-    def generate_followup_message(self, lead: Lead) -> str:
+        def call() -> str:
+            if not self.model:
+                return f"Hi {name}, great to connect!"
+            try:
+                text = self._generate(prompt, kind="first_message")
+                return (text or f"Hi {name}, great to connect!").strip()
+            except Exception as e:
+                bus.emit("warning", f"Gemini first-message error; using fallback: {e}")
+                return f"Hi {name}, great to connect! I enjoyed learning about your work at {company or 'your company'}. If you’re open, I’d love to share a quick idea relevant to your role as {role or 'your role'}."
+
+        return call
+
+    def _followup_message_call(self, lead: Lead) -> Callable[[], str]:
         context = self._conversation_context(lead)
         prompt = (
             "Write a short, friendly follow-up for LinkedIn referencing the ongoing context if useful. "
@@ -52,14 +247,32 @@ class GeminiClient:
             f"Lead: name={lead.name}, role={lead.role}, company={lead.company}.\n"
             f"Context:\n{context}"
         )
-        if not self.model:
-            return "Just bumping this to the top of your inbox—open to a quick chat?"
-        try:
-            resp = self.model.generate_content(prompt)
-            return (resp.text or "Just bumping this to the top of your inbox—open to a quick chat?").strip()
-        except Exception as e:
-            bus.emit("warning", f"Gemini follow-up error; using fallback: {e}")
-            return "Just bumping this up—open to a quick chat next week?"
+
+        def call() -> str:
+            if not self.model:
+                return "Just bumping this to the top of your inbox—open to a quick chat?"
+            try:
+                text = self._generate(prompt, kind="followup")
+                return (text or "Just bumping this to the top of your inbox—open to a quick chat?").strip()
+            except Exception as e:
+                bus.emit("warning", f"Gemini follow-up error; using fallback: {e}")
+                return "Just bumping this up—open to a quick chat next week?"
+
+        return call
+
+    def generate_first_message(self, lead: Lead) -> str:
+        return self._first_message_call(lead)()
+
+    def generate_first_messages(self, leads: List[Lead]) -> List[str]:
+        """Generate first messages for many leads concurrently, in input order."""
+        return self._fan_out([self._first_message_call(lead) for lead in leads])
+
+    def generate_followup_message(self, lead: Lead) -> str:
+        return self._followup_message_call(lead)()
+
+    def generate_followup_messages(self, leads: List[Lead]) -> List[str]:
+        """Generate follow-ups for many leads concurrently, in input order."""
+        return self._fan_out([self._followup_message_call(lead) for lead in leads])
 
     def classify_reply(self, lead: Lead, reply_text: str) -> dict:
         prompt = (
@@ -67,22 +280,59 @@ class GeminiClient:
             "Return JSON with keys: interest (interested|not interested|unsure), action (next step), summary.\n"
             f"Reply: {reply_text}"
         )
+        default = {"interest": "unsure", "action": "ack", "summary": reply_text[:200]}
         if not self.model:
-            return {"interest": "unsure", "action": "ack", "summary": reply_text[:200]}
+            return default
         try:
-            resp = self.model.generate_content(prompt)
-            text = resp.text or "{\"interest\": \"unsure\", \"action\": \"ack\", \"summary\": \"\"}"
+            text = self._generate(
+                prompt,
+                kind="classify",
+                generation_config={"response_mime_type": "application/json"},
+                validate=parse_classification,
+            )
+            return parse_classification(text)
+        except ValueError as e:
+            self.metrics.incr("classify", "parse_failures")
+            self.logger.warning("Unparseable classification (%s); defaulting", e)
+            return default
         except Exception as e:
             bus.emit("warning", f"Gemini classify error; defaulting: {e}")
-            text = "{\"interest\": \"unsure\", \"action\": \"ack\", \"summary\": \"\"}"
-        # naive parse fallback
-        try:
-            import json
+            return default
+
+    def respond_to_reply(self, lead: Lead, reply_text: str) -> ReplyDecision:
+        """Classify an inbound message and draft the answer, per ``reply_mode``.
 
-            data = json.loads(text)
-        except Exception:
-            data = {"interest": "unsure", "action": "ack", "summary": text[:500]}
-        return data
+        ``combined`` asks for both in one schema-constrained call and falls
+        back to the two-call ``separate`` flow if the response fails validation.
+        """
+        if self.reply_mode == "combined" and self.model:
+            context = self._conversation_context(lead)
+            prompt = (
+                "You handle inbound replies in a LinkedIn sales prospecting conversation. "
+                "Classify the prospect's latest message and write our reply.\n"
+                "interest: interested|not interested|unsure. action: the next step. summary: one sentence. "
+                "reply: helpful, succinct and natural, 500 characters max.\n"
+                f"Context:\n{context}\n"
+                f"Prospect said: {reply_text}"
+            )
+            try:
+                text = self._generate(
+                    prompt,
+                    kind="classify_and_reply",
+                    generation_config={"response_mime_type": "application/json", "response_schema": REPLY_DECISION_SCHEMA},
+                    validate=parse_reply_decision,
+                )
+                return parse_reply_decision(text)
+            except ValueError as e:
+                self.metrics.incr("classify_and_reply", "parse_failures")
+                self.logger.warning("Combined reply failed validation (%s); using separate calls", e)
+            except Exception as e:
+                bus.emit("warning", f"Gemini combined reply error; using separate calls: {e}")
+            mode = "fallback"
+        else:
+            mode = "separate"
+        classification = self.classify_reply(lead, reply_text)
+        return ReplyDecision(reply=self.generate_reply(lead, reply_text), mode=mode, **classification)
 
     def generate_reply(self, lead: Lead, latest_user_msg: str) -> str:
         context = self._conversation_context(lead)
@@ -94,10 +344,8 @@ class GeminiClient:
         if not self.model:
             return "Thanks for the note—would a quick 10–15 min chat work next week?"
         try:
-            resp = self.model.generate_content(prompt)
-            return (resp.text or "Thanks for the note—would a quick 10–15 min chat work next week?").strip()
+            text = self._generate(prompt, kind="reply")
+            return (text or "Thanks for the note—would a quick 10–15 min chat work next week?").strip()
         except Exception as e:
             bus.emit("warning", f"Gemini reply error; using fallback: {e}")
             return "Appreciate the reply—would a quick 10–15 min chat work next week?"
-
-
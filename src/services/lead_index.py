@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from src.models import Lead, db
+
+
+@dataclass
+class LeadMatch:
+    lead_id: int
+    confidence: float  # 1.0 for a profile URL hit, name similarity otherwise
+    method: str  # url | name
+
+
+def normalize_profile_url(url: Optional[str]) -> Optional[str]:
+    """Canonical key for a LinkedIn profile URL: ``in/<slug>`` when recognisable.
+
+    Scheme, ``www.``/country subdomains, query string, trailing slash and case
+    all vary between the sheet and what the messaging UI links to.
+    """
+    if not url:
+        return None
+    parts = urlsplit(url.strip() if "://" in url else f"https://{url.strip()}")
+    path = unquote(parts.path).rstrip("/").lower()
+    match = re.search(r"/(in|pub)/([^/]+)", path)
+    if match:
+        return f"{match.group(1)}/{match.group(2)}"
+    host = parts.netloc.lower().split(":")[0]
+    return f"{host}{path}" if host else path or None
+
+
+def normalize_name(name: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def _trigrams(normalized: str) -> Set[str]:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LeadIndex:
+    """In-memory lookup from inbox participants to leads.
+
+    Profile URLs resolve through a hash map; names through token and trigram
+    postings scored by Dice similarity. ``refresh`` only reloads leads
+    changed since the previous call, so the index is built once and then kept
+    current per job run.
+    """
+
+    def __init__(self, min_name_score: float = 0.6, ambiguity_margin: float = 0.05,
+                 overlap_seconds: float = 300.0):
+        self.min_name_score = min_name_score
+        self.ambiguity_margin = ambiguity_margin
+        # Rows can commit after a refresh with an updated_at stamped before it
+        # (onupdate, the import's precomputed time), so each refresh re-reads this far back
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._lock = threading.Lock()
+        self._by_url: Dict[str, int] = {}
+        self._names: Dict[int, Tuple[str, Set[str], Set[str]]] = {}
+        self._urls: Dict[int, str] = {}
+        self._token_postings: Dict[str, Set[int]] = defaultdict(set)
+        self._trigram_postings: Dict[str, Set[int]] = defaultdict(set)
+        self._synced_at: Optional[datetime] = None
+        self._versions: Dict[int, Optional[datetime]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def refresh(self) -> int:
+        """Load leads created or updated since the last refresh; needs an app context.
+
+        Returns how many leads changed; rows re-read in the overlap window are skipped.
+        """
+        started = datetime.utcnow()
+        query = db.session.query(Lead.id, Lead.name, Lead.profile_url, Lead.updated_at)
+        if self._synced_at is not None:
+            query = query.filter(Lead.updated_at >= self._synced_at)
+        count = 0
+        for lead_id, name, profile_url, updated_at in query.yield_per(2000):
+            if lead_id in self._versions and self._versions[lead_id] == updated_at:
+                continue
+            self.add(lead_id, name, profile_url)
+            self._versions[lead_id] = updated_at
+            count += 1
+        self._synced_at = started - self.overlap
+        return count
+
+    def add(self, lead_id: int, name: Optional[str], profile_url: Optional[str]) -> None:
+        with self._lock:
+            self._remove_locked(lead_id)
+            url_key = normalize_profile_url(profile_url)
+            if url_key:
+                self._by_url[url_key] = lead_id
+                self._urls[lead_id] = url_key
+            normalized = normalize_name(name)
+            tokens = set(normalized.split())
+            grams = _trigrams(normalized) if normalized else set()
+            self._names[lead_id] = (normalized, tokens, grams)
+            for token in tokens:
+                self._token_postings[token].add(lead_id)
+            for gram in grams:
+                self._trigram_postings[gram].add(lead_id)
+
+    def remove(self, lead_id: int) -> None:
+        with self._lock:
+            self._remove_locked(lead_id)
+            self._versions.pop(lead_id, None)
+
+    def _remove_locked(self, lead_id: int) -> None:
+        url_key = self._urls.pop(lead_id, None)
+        if url_key and self._by_url.get(url_key) == lead_id:
+            del self._by_url[url_key]
+        entry = self._names.pop(lead_id, None)
+        if entry is None:
+            return
+        _, tokens, grams = entry
+        for token in tokens:
+            self._token_postings[token].discard(lead_id)
+        for gram in grams:
+            self._trigram_postings[gram].discard(lead_id)
+
+    def resolve(self, profile_url: Optional[str] = None, name: Optional[str] = None) -> Optional[LeadMatch]:
+        with self._lock:
+            url_key = normalize_profile_url(profile_url)
+            if url_key and url_key in self._by_url:
+                return LeadMatch(lead_id=self._by_url[url_key], confidence=1.0, method="url")
+            normalized = normalize_name(name)
+            if not normalized:
+                return None
+            return self._resolve_name(normalized)
+
+    def _resolve_name(self, normalized: str) -> Optional[LeadMatch]:
+        tokens = set(normalized.split())
+        grams = _trigrams(normalized)
+        shared_tokens: Counter = Counter()
+        for token in tokens:
+            shared_tokens.update(self._token_postings.get(token, ()))
+        shared_grams: Counter = Counter()
+        for gram in grams:
+            shared_grams.update(self._trigram_postings.get(gram, ()))
+
+        scored = []
+        for lead_id, gram_hits in shared_grams.items():
+            cand_name, cand_tokens, cand_grams = self._names[lead_id]
+            if cand_name == normalized:
+                score = 1.0
+            else:
+                token_dice = 2.0 * shared_tokens.get(lead_id, 0) / (len(tokens) + len(cand_tokens))
+                gram_dice = 2.0 * gram_hits / (len(grams) + len(cand_grams))
+                score = 0.5 * token_dice + 0.5 * gram_dice
+            scored.append((score, lead_id))
+        if not scored:
+            return None
+        scored.sort(reverse=True)
+        best_score, best_id = scored[0]
+        if best_score < self.min_name_score:
+            return None
+        if len(scored) > 1 and best_score - scored[1][0] < self.ambiguity_margin:
+            # Two leads look equally likely (e.g. a shared name); guessing would misroute the reply
+            return None
+        return LeadMatch(lead_id=best_id, confidence=round(best_score, 4), method="name")
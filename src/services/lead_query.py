@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from src.models import Lead, db
+
+
+MAX_PAGE_SIZE = 200
+
+LIST_COLUMNS = (
+    Lead.id,
+    Lead.name,
+    Lead.role,
+    Lead.company,
+    Lead.profile_url,
+    Lead.message_sent,
+    Lead.reply_status,
+    Lead.interest_level,
+    Lead.follow_up_taken,
+    Lead.last_contact_time,
+    Lead.created_at,
+)
+
+
+@dataclass
+class LeadFilters:
+    reply_status: Optional[str] = None
+    interest_level: Optional[str] = None
+    message_sent: Optional[bool] = None
+    search: Optional[str] = None
+
+    @classmethod
+    def from_args(cls, args) -> "LeadFilters":
+        sent = (args.get("message_sent") or "").lower()
+        return cls(
+            reply_status=args.get("reply_status") or None,
+            interest_level=args.get("interest_level") or None,
+            message_sent={"true": True, "false": False}.get(sent),
+            search=(args.get("q") or "").strip() or None,
+        )
+
+
+def encode_cursor(created_at: datetime, lead_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{lead_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created, lead_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created), int(lead_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def list_leads(filters: LeadFilters, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of leads, newest first, and the cursor for the next page.
+
+    Keyset pagination on (created_at, id): every page is an index range
+    scan, so page N costs the same as page 1.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = db.session.query(*LIST_COLUMNS)
+    if filters.reply_status:
+        query = query.filter(Lead.reply_status == filters.reply_status)
+    if filters.interest_level:
+        query = query.filter(Lead.interest_level == filters.interest_level)
+    if filters.message_sent is not None:
+        query = query.filter(Lead.message_sent == filters.message_sent)
+    if filters.search:
+        pattern = f"%{filters.search}%"
+        query = query.filter(
+            or_(
+                Lead.name.ilike(pattern),
+                Lead.company.ilike(pattern),
+                Lead.role.ilike(pattern),
+                Lead.profile_url.ilike(pattern),
+            )
+        )
+    if cursor:
+        created_at, lead_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(Lead.created_at < created_at, and_(Lead.created_at == created_at, Lead.id < lead_id))
+        )
+    rows = query.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [_row_to_dict(r) for r in rows], next_cursor
+
+
+def _row_to_dict(r) -> Dict[str, Any]:
+    return {
+        "id": r.id,
+        "name": r.name,
+        "role": r.role,
+        "company": r.company,
+        "profile_url": r.profile_url,
+        "message_sent": r.message_sent,
+        "reply_status": r.reply_status,
+        "interest_level": r.interest_level,
+        "follow_up_taken": r.follow_up_taken,
+        "last_contact_time": r.last_contact_time.isoformat() if r.last_contact_time else None,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+    }
@@ -1,24 +1,49 @@
 from __future__ import annotations
 
 import os
+import re
 import time
+import hashlib
 import logging
-from dataclasses import dataclass
-from typing import List, Optional, Set
-import random
+import threading
+import functools
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set
+from urllib.parse import urlsplit
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from urllib3.exceptions import MaxRetryError
 import undetected_chromedriver as uc
 from selenium import webdriver
 from src.services.event_bus import bus
+from src.services.driver_pool import DriverPool
+from src.services.lead_index import normalize_profile_url
+from src.services.metrics import span
+from src.services.profile_manager import LINKEDIN_AUTH_COOKIE, ProfileManager
+from src.services.page_readiness import ActionTiming, PacingPolicy, PageReadiness
+from src.services.selector_registry import SelectorMatch, SelectorRegistry
+from src.services.text_entry import EntryResult, TextEntry
 
 
 LOGIN_URL = "https://www.linkedin.com/login"
 
+# Messages read from each changed inbox thread: a lead may send several between polls
+INBOX_READ_LAST_N = 10
+
+# CDP Network.setCookies accepts these fields of a Network.getAllCookies entry
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
 
 @dataclass
 class InboxMessage:
@@ -27,45 +52,377 @@ class InboxMessage:
     timestamp: float
     profile_url: str | None = None
     participant_name: str | None = None
+    thread_url: str | None = None
+    event_urn: str | None = None
+    # The thread's last messages, oldest first, so the caller can find every one it has not recorded
+    recent: List["ThreadMessage"] = field(default_factory=list)
+
+
+# Reads participant and the last N messages of the open thread in one round trip;
+# mirrors _extract_participant_info/_extract_latest_message, which remain as fallback.
+READ_THREAD_JS = """
+const lastN = arguments[0];
+const firstHref = (sels) => {
+  for (const s of sels) {
+    for (const a of document.querySelectorAll(s)) { if (a.href && a.href.indexOf('/in/') !== -1) return a.href; }
+  }
+  return null;
+};
+const firstText = (root, sels) => {
+  for (const s of sels) { const el = root.querySelector(s); const t = el && (el.innerText || '').trim(); if (t) return t; }
+  return null;
+};
+let events = Array.from(document.querySelectorAll('div[data-event-urn]'));
+if (!events.length) events = Array.from(document.querySelectorAll('div.msg-s-event-listitem'));
+const messages = events.slice(-lastN).map((ev) => {
+  let incoming = false;
+  if ((ev.getAttribute('class') || '').indexOf('other') !== -1) {
+    incoming = true;
+  } else if (ev.querySelector('img.msg-s-event-listitem__profile-picture')) {
+    const link = ev.querySelector('a.msg-s-event-listitem__link');
+    incoming = link ? !!(link.href && link.href.indexOf('/in/') !== -1) : true;
+  }
+  let text = '';
+  for (const s of ['p.msg-s-event-listitem__body', 'div.msg-s-event__content p', 'p', 'span']) {
+    const found = ev.querySelectorAll(s);
+    if (found.length) { text = (found[found.length - 1].innerText || '').trim(); if (text) break; }
+  }
+  if (!text) text = (ev.innerText || '').trim();
+  return {urn: ev.getAttribute('data-event-urn'), incoming: incoming, text: text};
+});
+return {
+  profile_url: firstHref(['a.msg-entity-lockup__link', "header a[href*='linkedin.com/in/']",
+                          "a[href*='linkedin.com/in/']", '.msg-thread__link-to-profile']),
+  participant_name: firstText(document, ['.msg-entity-lockup__entity-title', '.msg-thread__link-to-profile',
+                                         'h2.msg-entity-lockup__entity-title', '.artdeco-entity-lockup__title']),
+  messages: messages,
+};
+"""
+
+
+@dataclass
+class ThreadMessage:
+    text: str
+    incoming: bool
+    event_urn: str | None = None
+
+
+@dataclass
+class CardSnapshot:
+    """What the inbox list shows for one thread without opening it."""
+    thread_key: str
+    preview: str
+    last_activity: str
+    unread: bool
+    thread_url: str | None = None
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha1(f"{self.preview}\x00{self.last_activity}".encode("utf-8")).hexdigest()
+
+
+# Reads every conversation card in one round trip instead of several WebDriver calls per card
+READ_CARDS_JS = """
+const pick = (root, sels) => {
+  for (const s of sels) { const el = root.querySelector(s); if (el && el.innerText) return el.innerText.trim(); }
+  return '';
+};
+return arguments[0].map((card, i) => {
+  const link = card.querySelector("a[href*='/messaging/thread/']");
+  const name = pick(card, ['.msg-conversation-listitem__participant-names', '.msg-conversation-card__participant-names', 'h3']);
+  return {
+    href: link ? link.href.split('?')[0] : null,
+    name: name,
+    preview: pick(card, ['.msg-conversation-card__message-snippet', '.msg-conversation-listitem__message-snippet', 'p']),
+    time: pick(card, ['time', '.msg-conversation-listitem__time-stamp', '.msg-conversation-card__time-stamp']),
+    unread: !!card.querySelector('.msg-conversation-card__unread-count, .notification-badge--show')
+            || (card.className || '').indexOf('unread') !== -1,
+    index: i,
+  };
+});
+"""
+
+# Identifies what the thread pane shows: URL path, participant and newest event
+THREAD_SIGNATURE_JS = """
+const items = document.querySelectorAll('[data-event-urn]');
+const last = items.length ? items[items.length - 1].getAttribute('data-event-urn') : '';
+const title = document.querySelector('.msg-entity-lockup__entity-title');
+return location.pathname + '|' + (title ? title.textContent.trim() : '') + '|' + last;
+"""
+
+
+# Where the message just sent lives: the page itself, else the open overlay bubble
+# arguments[0] is the lead's canonical profile key (``in/<slug>``). Chat bubbles from earlier
+# pages stay open, so only a bubble whose participant link is this lead counts.
+THREAD_HREF_JS = """
+if (location.pathname.indexOf('/messaging/thread/') !== -1) return location.href;
+const key = '/' + (arguments[0] || '').toLowerCase();
+if (key === '/') return null;
+const isLead = (a) => {
+  try { return decodeURIComponent(new URL(a.href).pathname).toLowerCase().replace(/\\/+$/, '').endsWith(key); }
+  catch (e) { return false; }
+};
+const active = 'msg-overlay-conversation-bubble--is-active';
+const bubbles = Array.from(document.querySelectorAll('.msg-overlay-conversation-bubble'))
+  .sort((a, b) => b.classList.contains(active) - a.classList.contains(active));
+for (const bubble of bubbles) {
+  if (!Array.from(bubble.querySelectorAll("a[href*='/in/'], a[href*='/pub/']")).some(isLead)) continue;
+  const link = bubble.querySelector("a[href*='/messaging/thread/']");
+  return link ? link.href : null;
+}
+return null;
+"""
+
+_THREAD_PATH_RE = re.compile(r"/messaging/thread/[^/?#]+")
+
+
+def thread_url_from(href: Optional[str]) -> Optional[str]:
+    """Canonical ``https://www.linkedin.com/messaging/thread/<id>/`` for a link, else None."""
+    match = _THREAD_PATH_RE.search(href or "")
+    return f"https://www.linkedin.com{match.group(0)}/" if match else None
+
+
+def _thread_switched(before: str, snap: Optional[CardSnapshot]):
+    """Wait condition: the clicked card's thread is open (by URL when known) and has loaded."""
+    target = urlsplit(snap.thread_url).path.rstrip("/") if snap is not None and snap.thread_url else None
+
+    def condition(driver):
+        current = driver.execute_script(THREAD_SIGNATURE_JS) or ""
+        path, _, last_event = current.split("|", 2)
+        if target:
+            return path.rstrip("/") == target and bool(last_event)
+        return current != before
+
+    return condition
+
+
+# chromedriver reports a crashed or unreachable Chrome as a bare WebDriverException
+SESSION_LOST_MARKERS = ("invalid session id", "chrome not reachable", "disconnected", "session deleted",
+                        "target window already closed")
+
+
+def _session_lost(exc: BaseException) -> bool:
+    """True when the browser behind the session is gone, not just an element or page error."""
+    if isinstance(exc, (InvalidSessionIdException, NoSuchWindowException, MaxRetryError, ConnectionError)):
+        return True
+    if type(exc) is WebDriverException:
+        return any(marker in str(exc).lower() for marker in SESSION_LOST_MARKERS)
+    return False
+
+
+def _releases_driver(fn):
+    """Check the thread's browser session back in once a top-level call returns."""
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return fn(self, *args, **kwargs)
+        except BaseException as exc:
+            self._note_driver_error(exc)
+            raise
+        finally:
+            if not getattr(self._local, "depth", 0):
+                self._release_driver()
+    return wrapper
 
 
 class LinkedInAutomation:
-    def __init__(self, headless: bool = True, profile_dir: str | None = None):
+    def __init__(self, headless: bool = True, profile_dir: str | None = None,
+                 pool_size: int = 1, checkout_timeout: float | None = None,
+                 text_entry: TextEntry | None = None, readiness: PageReadiness | None = None,
+                 pacing: PacingPolicy | None = None, selectors: SelectorRegistry | None = None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.headless = headless
         self.profile_dir = profile_dir or os.environ.get("SELENIUM_PROFILE_DIR", "selenium_profile")
-        self.driver = None
+        self.checkout_timeout = checkout_timeout
+        self.text_entry = text_entry or TextEntry()
+        self.readiness = readiness or PageReadiness()
+        self.pacing = pacing or PacingPolicy()
+        self.selectors = selectors or SelectorRegistry()
+        self.pool = DriverPool(self._launch_driver, size=pool_size)
+        self._local = threading.local()
+        # LinkedIn cookies of the logged-in account, copied into every other pooled
+        # session (each has its own profile dir) so no worker sends logged out
+        self._auth_lock = threading.Lock()
+        self._auth_cookies: Optional[List[dict]] = None
+        self._auth_version = 0
+        self._auth_synced: Dict[tuple, int] = {}
+
+    @property
+    def driver(self):
+        pooled = getattr(self._local, "pooled", None)
+        return pooled.driver if pooled is not None else None
+
+    @contextmanager
+    def session(self) -> Iterator:
+        """Pin one pooled browser to the calling thread for several actions.
+
+        Needed when a later call depends on page state left by an earlier one,
+        e.g. ``send_reply`` after ``fetch_inbox_latest`` opened the thread.
+        """
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            self._ensure_driver()
+            yield self.driver
+        finally:
+            self._local.depth -= 1
+            if not self._local.depth:
+                self._release_driver()
 
     def _ensure_driver(self):
         if self.driver:
             return
-        
-        # Clean profile directory completely
-        import shutil
-        if os.path.exists(self.profile_dir):
+        # Includes Chrome startup when the pool has no warm browser
+        with span("driver_checkout"):
+            self._local.pooled = self.pool.checkout(timeout=self.checkout_timeout)
+        if self.pool.size > 1:
+            self._sync_auth(self._local.pooled)
+
+    def _linkedin_cookies(self, driver) -> List[dict]:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        return [
+            {k: c[k] for k in COOKIE_FIELDS if k in c and not (k == "expires" and c.get("session"))}
+            for c in cookies if "linkedin.com" in c.get("domain", "")
+        ]
+
+    def _share_auth(self) -> None:
+        """Take the current session's LinkedIn cookies as the ones every pooled session should hold."""
+        pooled = self._local.pooled
+        try:
+            cookies = self._linkedin_cookies(pooled.driver)
+        except Exception as exc:
+            self.logger.warning("Could not read LinkedIn cookies to share across sessions: %s", exc)
+            return
+        if not any(c["name"] == LINKEDIN_AUTH_COOKIE for c in cookies):
+            return
+        with self._auth_lock:
+            self._auth_cookies = cookies
+            self._auth_version += 1
+            self._auth_synced[(pooled.slot, pooled.created_at)] = self._auth_version
+
+    def _sync_auth(self, pooled) -> None:
+        key = (pooled.slot, pooled.created_at)
+        with self._auth_lock:
+            cookies, version = self._auth_cookies, self._auth_version
+            if cookies is not None and self._auth_synced.get(key) == version:
+                return
+        if cookies is None:
+            # No login this run yet: a session restored from its profile becomes the source
+            self._share_auth()
+            return
+        try:
+            pooled.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        except Exception as exc:
+            self.logger.warning("Could not copy the LinkedIn login into session %d: %s", pooled.slot, exc)
+            return
+        with self._auth_lock:
+            self._auth_synced[key] = version
+
+    def _note_driver_error(self, exc: BaseException) -> None:
+        # A dead session goes back to the pool as broken, so the next checkout relaunches it
+        if getattr(self._local, "pooled", None) is not None and _session_lost(exc):
+            self._local.driver_lost = True
+
+    def _release_driver(self) -> None:
+        pooled = getattr(self._local, "pooled", None)
+        broken = getattr(self._local, "driver_lost", False)
+        self._local.driver_lost = False
+        if pooled is not None:
+            self._local.pooled = None
+            if broken:
+                self.logger.warning("Browser session %d lost; it will be relaunched", pooled.slot)
+            self.pool.checkin(pooled, broken=broken)
+
+    def _profile_dir_for(self, slot: int) -> str:
+        # Chrome locks its user-data-dir, so every pooled session needs its own;
+        # the login is copied between them by _sync_auth
+        return self.profile_dir if slot == 0 else f"{self.profile_dir}_{slot}"
+
+    def _launch_driver(self, slot: int):
+        with span("chrome_startup"):
+            return self._launch_chrome(slot)
+
+    def _launch_chrome(self, slot: int):
+        started = time.monotonic()
+        profile = ProfileManager(self._profile_dir_for(slot))
+        profile_state = profile.prepare()
+
+        bus.emit("info", f"Starting Chrome (session {slot}, {profile_state} profile)")
+        try:
+            driver = self._start_chrome(profile.profile_dir)
+        except Exception as first_error:
+            if profile_state == "cold":
+                bus.emit("error", f"Chrome startup failed: {str(first_error)[:100]}")
+                raise
+            # A profile that parses fine can still be unusable; retry once from scratch
+            self.logger.warning("Chrome failed on existing profile, resetting it: %s", first_error)
+            profile.reset()
+            profile_state = "reset"
             try:
-                shutil.rmtree(self.profile_dir)
-            except Exception:
-                pass
-        os.makedirs(self.profile_dir, exist_ok=True)
+                driver = self._start_chrome(profile.profile_dir)
+            except Exception as e:
+                bus.emit("error", f"Chrome startup failed: {str(e)[:100]}")
+                raise
 
+        restored = profile.session_restored(driver)
+        startup_s = time.monotonic() - started
+        session_note = {True: "session restored", False: "login required", None: "session unknown"}[restored]
+        bus.emit(
+            "success" if restored else "info",
+            f"Chrome ready in {startup_s:.1f}s ({session_note})",
+            {"slot": slot, "startup_s": round(startup_s, 3), "profile_state": profile_state, "session_restored": restored},
+        )
+        return driver
+
+    def _start_chrome(self, profile_dir: str):
         options = webdriver.ChromeOptions()
+        options.add_argument(f'--user-data-dir={profile_dir}')
         options.add_argument('--no-sandbox')
         options.add_argument('--disable-dev-shm-usage')
         options.add_experimental_option('excludeSwitches', ['enable-logging'])
+        # CDP Network events in the performance log drive the network-idle wait
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         if self.headless:
             options.add_argument('--headless')
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(45)
+        return driver
 
-        bus.emit("info", "Starting Chrome")
+    @contextmanager
+    def _timed(self, action: str) -> Iterator[ActionTiming]:
+        """Account page-wait and pacing time of one action separately."""
+        timing = ActionTiming()
+        self._local.timing = timing
         try:
-            self.driver = webdriver.Chrome(options=options)
-            self.driver.set_page_load_timeout(45)
-        except Exception as e:
-            bus.emit("error", f"Chrome startup failed: {str(e)[:100]}")
-            raise
+            yield timing
+        finally:
+            self._local.timing = None
+            self.readiness.record(action, timing)
+
+    def _charge(self, component: str, seconds: float) -> None:
+        timing = getattr(self._local, "timing", None)
+        if timing is not None:
+            setattr(timing, component, getattr(timing, component) + seconds)
+
+    def _pace(self, point: str) -> None:
+        self._charge("pacing_s", self.pacing.pause(point))
 
-    def _human_like_wait(self, min_seconds: float = 0.2, max_seconds: float = 0.6) -> None:
-        time.sleep(random.uniform(min_seconds, max_seconds))
+    def _await(self, wait, *args, **kwargs):
+        """Run a PageReadiness wait against this thread's driver, charged as ready time."""
+        started = time.monotonic()
+        try:
+            return wait(self.driver, *args, **kwargs)
+        finally:
+            self._charge("ready_s", time.monotonic() - started)
+
+    def _navigate(self, url: str) -> None:
+        self.readiness.drain_network_log(self.driver)
+        with span("navigate"):
+            started = time.monotonic()
+            self.driver.get(url)
+            self._charge("ready_s", time.monotonic() - started)
+            self._await(self.readiness.wait_document_ready)
+            self._await(self.readiness.wait_network_idle)
+        self._pace("navigate")
 
     def _try_find(self, locator, timeout: int = 6):
         try:
@@ -73,53 +430,121 @@ class LinkedInAutomation:
         except TimeoutException:
             return None
 
+    def _locate(self, target: str, locators, timeout: float,
+                condition=EC.element_to_be_clickable) -> Optional[SelectorMatch]:
+        """Resolve a UI target through the selector registry, charged as ready time."""
+        with span("selector_wait", target):
+            return self.selectors.find(
+                self.driver, target, locators, timeout, condition,
+                wait=functools.partial(self._await, self.readiness.wait_for),
+            )
+
+    MESSAGE_BOX_LOCATORS = [
+        (By.CSS_SELECTOR, "div[contenteditable='true'][role='textbox']"),
+        (By.CSS_SELECTOR, "div.msg-form__contenteditable[contenteditable='true']"),
+        (By.CSS_SELECTOR, "div.msg-form__msg-content-container--scrollable div[contenteditable='true']"),
+        (By.CSS_SELECTOR, "div[data-placeholder*='message']"),
+        (By.XPATH, "//div[@role='textbox' and @contenteditable='true']"),
+    ]
+    REPLY_BOX_LOCATORS = [
+        (By.CSS_SELECTOR, "div.msg-form__contenteditable[contenteditable='true'][role='textbox']"),
+        *MESSAGE_BOX_LOCATORS,
+    ]
+    MESSAGE_BUTTON_LOCATORS = [
+        (By.XPATH, "//button[contains(@aria-label, 'Message')]"),
+        (By.XPATH, "//a[contains(@href, '/messaging/thread/')]"),
+        (By.XPATH, "//button[contains(., 'Message')]"),
+        (By.XPATH, "//a[contains(., 'Message')]"),
+        (By.XPATH, "//button[@data-control-name='message']"),
+    ]
+    CONVERSATION_CARD_LOCATORS = [
+        (By.CSS_SELECTOR, "li.msg-conversation-listitem"),
+        (By.CSS_SELECTOR, "div[data-view-name='msg-conversations-container'] li"),
+        (By.CSS_SELECTOR, "ul.msg-conversations-container__conversations-list li"),
+    ]
+    ACCEPT_REQUEST_XPATH = (
+        "//button[contains(text(), 'Accept')] | //button[.//span[contains(text(), 'Accept')]]"
+        " | //button[contains(@aria-label, 'Accept')]"
+        " | //button[contains(@class, 'artdeco-button--primary') and contains(., 'Accept')]"
+    )
+
     def _find_first_message_box(self, timeout: int = 12):
-        locators = [
-            (By.CSS_SELECTOR, "div[contenteditable='true'][role='textbox']"),
-            (By.CSS_SELECTOR, "div.msg-form__contenteditable[contenteditable='true']"),
-            (By.CSS_SELECTOR, "div.msg-form__msg-content-container--scrollable div[contenteditable='true']"),
-            (By.CSS_SELECTOR, "div[data-placeholder*='message']"),
-            (By.XPATH, "//div[@role='textbox' and @contenteditable='true']"),
-        ]
-        deadline = time.time() + timeout
-        while time.time() < deadline:
-            for loc in locators:
-                el = self._try_find(loc, timeout=2)
-                if el is not None and el.is_enabled():
-                    return el
-            time.sleep(0.5)
-        raise TimeoutException("Could not locate a message input box")
-
-    def _maybe_accept_message_request(self):
-        accept_selectors = [
-            "//button[contains(text(), 'Accept')]",
-            "//button[.//span[contains(text(), 'Accept')]]",
-            "//button[@aria-label*='Accept']",
-            "//button[contains(@class, 'artdeco-button--primary') and contains(., 'Accept')]"
-        ]
-        for selector in accept_selectors:
-            btn = self._try_find((By.XPATH, selector), timeout=2)
-            if btn is not None:
-                try:
-                    btn.click()
-                    self._human_like_wait(0.5, 1.0)
-                    bus.emit("info", "Accepted message request")
-                    return
-                except Exception as e:
-                    self.logger.debug(f"Failed to click accept button: {e}")
+        match = self._locate("message_box", self.MESSAGE_BOX_LOCATORS, timeout)
+        if not match:
+            raise TimeoutException("Could not locate a message input box")
+        return match.element
+
+    def _maybe_accept_message_request(self, timeout: float = 8):
+        # Wait for whichever the compose step shows first: the box, or a pending request
+        accept = (By.XPATH, self.ACCEPT_REQUEST_XPATH)
+        ready = self._await(
+            self.readiness.wait_for,
+            EC.any_of(
+                EC.element_to_be_clickable(accept),
+                *(EC.presence_of_element_located(loc) for loc in self.MESSAGE_BOX_LOCATORS),
+            ),
+            timeout,
+        )
+        buttons = self.driver.find_elements(*accept) if ready else []
+        for btn in buttons:
+            try:
+                btn.click()
+                self._pace("click")
+                bus.emit("info", "Accepted message request")
+                return
+            except Exception as e:
+                self.logger.debug(f"Failed to click accept button: {e}")
+
+    def _wait_sent(self, box, timeout: float = 5) -> bool:
+        # LinkedIn empties (or re-renders) the composer once the message is posted
+        def emptied(_driver):
+            try:
+                return not (box.text or "").strip()
+            except StaleElementReferenceException:
+                return True
 
-    def _type_message_human_like(self, element, message: str) -> None:
-        for chunk in message.split(" "):
-            element.send_keys(chunk + " ")
-            time.sleep(random.uniform(0.03, 0.12))
+        return bool(self._await(self.readiness.wait_for, emptied, timeout))
 
-    def _sanitize_bmp(self, text: str) -> str:
-        # Remove characters outside Basic Multilingual Plane to avoid ChromeDriver BMP error
-        return "".join(ch for ch in text or "" if ord(ch) <= 0xFFFF)
+    @property
+    def last_thread_url(self) -> Optional[str]:
+        """Thread URL of the last message this thread sent, for storing on the lead."""
+        return getattr(self._local, "thread_url", None)
 
+    def _open_thread(self, thread_url: str) -> bool:
+        """Go to a messaging thread unless it is already open; False if LinkedIn sent us elsewhere."""
+        target = urlsplit(thread_url).path.rstrip("/")
+        if urlsplit(self.driver.current_url or "").path.rstrip("/") != target:
+            self._navigate(thread_url)
+        return urlsplit(self.driver.current_url or "").path.rstrip("/") == target
 
+    def _compose_and_send(self, box, message: str) -> EntryResult:
+        box.click()
+        self._pace("focus")
+        box.clear()
+        entry = self._enter_text(box, message)
+        self._pace("before_send")
+        box.send_keys(Keys.RETURN)
+        self._wait_sent(box)
+        self._pace("after_send")
+        return entry
 
+    def _enter_text(self, element, message: str) -> EntryResult:
+        with span("type_text", self.text_entry.strategy):
+            result = self.text_entry.enter(self.driver, element, message)
+        self.logger.info(
+            "Entered %d chars via %s in %.2fs (%d chunks)", result.chars, result.strategy, result.seconds, result.chunks
+        )
+        return result
+
+    @_releases_driver
     def login(self, username: str, password: str) -> bool:
+        """Log in on one pooled session; the other sessions get its cookies on their next checkout."""
+        ok = self._login(username, password)
+        if ok and self.pool.size > 1:
+            self._share_auth()
+        return ok
+
+    def _login(self, username: str, password: str) -> bool:
         try:
             self._ensure_driver()
             bus.emit("info", "Navigating to LinkedIn login page")
@@ -161,111 +586,135 @@ class LinkedInAutomation:
             bus.emit("error", "Login timeout. Might require MFA or manual login.")
             return False
         except WebDriverException as e:
+            self._note_driver_error(e)
             self.logger.exception("Login error: %s", e)
             bus.emit("error", f"Login error: {e}")
             return False
 
-    def send_reply(self, message: str) -> bool:
-        """Send a reply in the currently open conversation"""
-        try:
-            # Find the message input box using exact selector from HTML
-            box = self._try_find((By.CSS_SELECTOR, "div.msg-form__contenteditable[contenteditable='true'][role='textbox']"), timeout=10)
-            if not box:
-                bus.emit("error", "Message input box not found")
-                return False
-            
-            # Click and focus the input
-            box.click()
-            self._human_like_wait(0.5, 1.0)
-            
-            # Clear any existing content and type message
-            box.clear()
-            safe_message = self._sanitize_bmp(message)
-            box.send_keys(safe_message)
-            
-            # Send with Enter
-            self._human_like_wait(0.5, 1.0)
-            box.send_keys(Keys.RETURN)
-            self._human_like_wait(1, 2)
-            
-            bus.emit("success", "Reply sent successfully")
-            return True
-            
-        except Exception as e:
-            self.logger.exception(f"Failed to send reply: {e}")
-            bus.emit("error", f"Reply failed: {str(e)[:100]}")
-            return False
-    
-    def send_message(self, profile_url: str, message: str) -> bool:
-        try:
-            self._ensure_driver()
-            bus.emit("info", f"Opening profile: {profile_url}")
-            self.driver.get(profile_url)
-            self._human_like_wait(2, 3)
-            
-            # Try to find and click message button
-            message_selectors = [
-                "//button[contains(@aria-label, 'Message')]",
-                "//a[contains(@href, '/messaging/thread/')]",
-                "//button[contains(., 'Message')]",
-                "//a[contains(., 'Message')]",
-                "//button[@data-control-name='message']"
-            ]
-            
-            msg_btn = None
-            for selector in message_selectors:
-                try:
-                    msg_btn = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    break
-                except TimeoutException:
-                    continue
-            
-            if not msg_btn:
-                # Try connect with note as fallback
-                try:
-                    connect_btn = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Connect')]"))
-                    )
-                    connect_btn.click()
-                    self._human_like_wait(1, 2)
-                    
-                    add_note_btn = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Add a note')]"))
-                    )
-                    add_note_btn.click()
-                except TimeoutException:
-                    bus.emit("error", f"No messaging or connect option for: {profile_url}")
+    @_releases_driver
+    def send_reply(self, message: str, thread_url: Optional[str] = None, profile_url: Optional[str] = None) -> bool:
+        """Send a reply in ``thread_url``, or in the currently open conversation.
+
+        If the thread cannot be opened and ``profile_url`` is given, the reply
+        goes through the profile's Message button instead.
+        """
+        with self._timed("send_reply") as timing:
+            self._local.thread_url = None
+            try:
+                self._ensure_driver()
+                if thread_url:
+                    # The inbox pass leaves the last thread it read open, not necessarily this one
+                    entry = self._send_in_thread(thread_url, message)
+                    if entry is None and profile_url:
+                        bus.emit("info", f"Saved thread unavailable, opening profile: {profile_url}")
+                        entry = self._send_via_profile(profile_url, message)
+                else:
+                    match = self._locate("reply_box", self.REPLY_BOX_LOCATORS, 10)
+                    entry = self._compose_and_send(match.element, message) if match else None
+                if entry is None:
+                    bus.emit("error", "Message input box not found")
                     return False
-            else:
-                msg_btn.click()
-            
-            self._human_like_wait(2, 3)
-            self._maybe_accept_message_request()
-            
-            # Find and use message box
-            box = self._find_first_message_box(timeout=15)
-            box.click()
-            self._human_like_wait(0.5, 1.0)
-            
-            # Clear any existing text and type message
-            box.clear()
-            safe_message = self._sanitize_bmp(message)
-            self._type_message_human_like(box, safe_message)
-            
-            # Send message
-            self._human_like_wait(0.5, 1.0)
-            box.send_keys(Keys.RETURN)
-            self._human_like_wait(1, 2)
-            
-            bus.emit("success", f"Message sent to {profile_url}")
-            return True
-            
-        except Exception as e:
-            self.logger.exception(f"Failed to send message to {profile_url}: {e}")
-            bus.emit("error", f"Failed to send message: {str(e)[:100]}")
-            return False
+
+                bus.emit(
+                    "success",
+                    "Reply sent successfully",
+                    {"entry_s": round(entry.seconds, 3), "entry_strategy": entry.strategy, **timing.as_dict()},
+                )
+                return True
+
+            except Exception as e:
+                self._note_driver_error(e)
+                self.logger.exception(f"Failed to send reply: {e}")
+                bus.emit("error", f"Reply failed: {str(e)[:100]}")
+                return False
+
+    @_releases_driver
+    def send_message(self, profile_url: str, message: str, thread_url: Optional[str] = None) -> bool:
+        """Message a lead in their existing thread when ``thread_url`` is known, else from their profile.
+
+        The thread URL the message went to is then available as ``last_thread_url``.
+        """
+        with self._timed("send_message") as timing:
+            self._local.thread_url = None
+            try:
+                self._ensure_driver()
+                via = "thread"
+                entry = self._send_in_thread(thread_url, message) if thread_url else None
+                if entry is None:
+                    if thread_url:
+                        bus.emit("info", f"Saved thread unavailable, opening profile: {profile_url}")
+                    via = "profile"
+                    entry = self._send_via_profile(profile_url, message)
+                    if entry is None:
+                        return False
+
+                bus.emit(
+                    "success",
+                    f"Message sent to {profile_url}",
+                    {"entry_s": round(entry.seconds, 3), "entry_strategy": entry.strategy, "via": via,
+                     **timing.as_dict()},
+                )
+                return True
+
+            except Exception as e:
+                self._note_driver_error(e)
+                self.logger.exception(f"Failed to send message to {profile_url}: {e}")
+                bus.emit("error", f"Failed to send message: {str(e)[:100]}")
+                return False
+
+    def _send_in_thread(self, thread_url: str, message: str) -> Optional[EntryResult]:
+        """None if the thread or its composer cannot be reached, before anything is typed."""
+        if not self._open_thread(thread_url):
+            return None
+        match = self._locate("reply_box", self.REPLY_BOX_LOCATORS, 10)
+        if not match:
+            return None
+        entry = self._compose_and_send(match.element, message)
+        self._local.thread_url = thread_url_from(thread_url)
+        return entry
+
+    def _send_via_profile(self, profile_url: str, message: str) -> Optional[EntryResult]:
+        bus.emit("info", f"Opening profile: {profile_url}")
+        self._navigate(profile_url)
+
+        # Message button, whichever variant the profile renders
+        msg_match = self._locate("message_button", self.MESSAGE_BUTTON_LOCATORS, 10)
+        thread_href = None
+
+        if not msg_match:
+            # Try connect with note as fallback
+            connect_btn = self._await(
+                self.readiness.wait_for, EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Connect')]")), 5
+            )
+            if not connect_btn:
+                bus.emit("error", f"No messaging or connect option for: {profile_url}")
+                return None
+            connect_btn.click()
+            self._pace("click")
+            add_note_btn = self._await(
+                self.readiness.wait_for, EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Add a note')]")), 5
+            )
+            if not add_note_btn:
+                bus.emit("error", f"No messaging or connect option for: {profile_url}")
+                return None
+            add_note_btn.click()
+        else:
+            # Some profiles render Message as a link straight to the thread
+            thread_href = msg_match.element.get_attribute("href")
+            msg_match.element.click()
+
+        self._pace("click")
+        self._maybe_accept_message_request()
+
+        box = self._find_first_message_box(timeout=15)
+        entry = self._compose_and_send(box, message)
+        if not thread_url_from(thread_href):
+            try:
+                thread_href = self.driver.execute_script(THREAD_HREF_JS, normalize_profile_url(profile_url))
+            except WebDriverException as e:
+                self.logger.debug(f"Could not read thread URL: {e}")
+        self._local.thread_url = thread_url_from(thread_href)
+        return entry
 
     def _normalize_profile_url(self, url: Optional[str]) -> Optional[str]:
         if not url:
@@ -273,29 +722,45 @@ class LinkedInAutomation:
         clean = url.split('?')[0].rstrip('/')
         return clean
 
-    def fetch_inbox_latest(self, limit: int = 30, allowed_profile_urls: Optional[Set[str]] = None) -> List[InboxMessage]:
+    def _read_card_snapshots(self, cards) -> List[CardSnapshot]:
+        snapshots = []
+        for raw in self.driver.execute_script(READ_CARDS_JS, cards) or []:
+            key = raw.get("href") or f"name:{raw.get('name') or raw.get('index')}"
+            snapshots.append(CardSnapshot(
+                thread_key=key,
+                preview=raw.get("preview") or "",
+                last_activity=raw.get("time") or "",
+                unread=bool(raw.get("unread")),
+                thread_url=raw.get("href"),
+            ))
+        return snapshots
+
+    @_releases_driver
+    def fetch_inbox_latest(self, limit: int = 30, allowed_profile_urls: Optional[Set[str]] = None,
+                           snapshots: Optional[Dict[str, CardSnapshot]] = None) -> List[InboxMessage]:
+        """Open inbox threads and return the latest incoming messages.
+
+        When ``snapshots`` (thread_key -> last seen card) is given, only threads
+        that are unread or whose card changed since then are opened, and the
+        dict is updated in place with what was read this run.
+        """
+        with self._timed("fetch_inbox"):
+            return self._fetch_inbox_latest(limit, allowed_profile_urls, snapshots)
+
+    def _fetch_inbox_latest(self, limit: int, allowed_profile_urls: Optional[Set[str]],
+                            snapshots: Optional[Dict[str, CardSnapshot]]) -> List[InboxMessage]:
         try:
             self._ensure_driver()
             bus.emit("info", "Checking LinkedIn inbox")
-            self.driver.get("https://www.linkedin.com/messaging/")
+            self._navigate("https://www.linkedin.com/messaging/")
             
             # Wait for conversations to load
-            conversation_selectors = [
-                "li.msg-conversation-listitem",
-                "div[data-view-name='msg-conversations-container'] li",
-                "ul.msg-conversations-container__conversations-list li"
-            ]
-            
             conv_cards = None
-            for selector in conversation_selectors:
-                try:
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    conv_cards = self.driver.find_elements(By.CSS_SELECTOR, selector)[:limit]
-                    break
-                except TimeoutException:
-                    continue
+            match = self._locate(
+                "conversation_list", self.CONVERSATION_CARD_LOCATORS, 10, condition=EC.presence_of_element_located
+            )
+            if match:
+                conv_cards = self.driver.find_elements(*match.locator)[:limit]
             
             if not conv_cards:
                 bus.emit("warning", "No conversations found in inbox")
@@ -306,17 +771,36 @@ class LinkedInAutomation:
             if allowed_profile_urls is not None:
                 normalized_allow = {self._normalize_profile_url(u) for u in allowed_profile_urls if u}
             
-            for i, card in enumerate(conv_cards):
+            to_open = list(zip(conv_cards, [None] * len(conv_cards)))
+            if snapshots is not None:
+                cards = self._read_card_snapshots(conv_cards)
+                to_open = []
+                for card, snap in zip(conv_cards, cards):
+                    previous = snapshots.get(snap.thread_key)
+                    if snap.unread or previous is None or previous.fingerprint != snap.fingerprint:
+                        to_open.append((card, snap))
+                bus.emit(
+                    "info",
+                    f"Inbox: {len(to_open)} of {len(cards)} threads changed",
+                    {"changed": len(to_open), "cards": len(cards)},
+                )
+
+            for i, (card, snap) in enumerate(to_open):
                 try:
-                    # Click conversation
+                    # Click conversation and wait until the thread pane shows it
+                    before = self.driver.execute_script(THREAD_SIGNATURE_JS)
                     self.driver.execute_script("arguments[0].click();", card)
-                    self._human_like_wait(1, 2)
-                    
-                    # Get participant info
-                    profile_url, participant_name = self._extract_participant_info()
+                    self._await(self.readiness.wait_for, _thread_switched(before, snap), 5)
+                    self._pace("click")
                     
-                    # Get latest message
-                    message_text, is_incoming = self._extract_latest_message()
+                    profile_url, participant_name, thread = self.read_open_thread(last_n=INBOX_READ_LAST_N)
+                    message_text = thread[-1].text if thread else ""
+                    is_incoming = bool(thread) and thread[-1].incoming
+                    event_urn = thread[-1].event_urn if thread else None
+                    if snap is not None:
+                        # Opening the thread clears its unread badge
+                        snap.unread = False
+                        snapshots[snap.thread_key] = snap
                     
                     if is_incoming and message_text:
                         # Check if this conversation is allowed
@@ -327,21 +811,49 @@ class LinkedInAutomation:
                                 text=message_text,
                                 timestamp=time.time(),
                                 profile_url=profile_url,
-                                participant_name=participant_name
+                                participant_name=participant_name,
+                                thread_url=snap.thread_url if snap is not None else None,
+                                event_urn=event_urn,
+                                recent=thread,
                             ))
                     
                 except Exception as e:
                     self.logger.debug(f"Error processing conversation {i}: {e}")
+                    if _session_lost(e):
+                        # Every remaining thread would fail the same way; keep what was read
+                        self._note_driver_error(e)
+                        break
                     continue
             
             bus.emit("info", f"Found {len(messages)} new messages")
             return messages
             
         except Exception as e:
+            self._note_driver_error(e)
             self.logger.exception(f"Failed to fetch inbox: {e}")
             bus.emit("error", f"Inbox check failed: {str(e)[:100]}")
             return []
     
+    def read_open_thread(self, last_n: int = 5) -> tuple[Optional[str], Optional[str], List[ThreadMessage]]:
+        """Participant URL, name and last ``last_n`` messages of the open thread.
+
+        One ``execute_script`` round trip; falls back to the per-element
+        WebDriver extraction if the script fails.
+        """
+        try:
+            data = self.driver.execute_script(READ_THREAD_JS, last_n) or {}
+            messages = [
+                ThreadMessage(text=m.get("text") or "", incoming=bool(m.get("incoming")), event_urn=m.get("urn"))
+                for m in data.get("messages") or []
+            ]
+            return data.get("profile_url"), data.get("participant_name"), messages
+        except WebDriverException as e:
+            self.logger.debug(f"Thread script failed, using element lookups: {e}")
+            profile_url, participant_name = self._extract_participant_info()
+            message_text, is_incoming = self._extract_latest_message()
+            messages = [ThreadMessage(text=message_text, incoming=is_incoming)] if message_text else []
+            return profile_url, participant_name, messages
+
     def _extract_participant_info(self) -> tuple[Optional[str], Optional[str]]:
         """Extract profile URL and name from current conversation"""
         profile_url = None
@@ -457,10 +969,6 @@ class LinkedInAutomation:
         return True
 
     def close(self):
-        try:
-            if self.driver:
-                self.driver.quit()
-        except Exception:
-            pass
+        self.pool.close()
 
 
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(self.labelnames, k)} {v:g}" for k, v in values]
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: counts per bucket (non-cumulative, last is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float]]:
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, (counts, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + [float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Counters and histograms rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: Dict[str, _Family] = {}
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = cls(name, *args, **kwargs)
+            return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        return "\n".join(line for family in families for line in family.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "linkedin_bot_stage_seconds", "Time spent in each pipeline stage.", ("stage", "detail")
+)
+STAGE_ERRORS = registry.counter(
+    "linkedin_bot_stage_errors_total", "Pipeline stages that raised.", ("stage", "detail")
+)
+
+
+@contextmanager
+def span(stage: str, detail: str = "") -> Iterator[None]:
+    """Time a pipeline stage into linkedin_bot_stage_seconds; count it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage, detail=detail)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, detail=detail)
+
+
+def timed(stage: str, detail: str = ""):
+    """Decorator form of ``span`` for whole jobs."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, detail):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_commits(session_cls=Session) -> None:
+    """Time every ORM commit (including its flush) as the ``db_commit`` stage."""
+    if event.contains(session_cls, "before_commit", _commit_started):
+        return
+    event.listen(session_cls, "before_commit", _commit_started)
+    event.listen(session_cls, "after_commit", _commit_finished)
+    event.listen(session_cls, "after_rollback", _commit_abandoned)
+
+
+def _commit_started(session) -> None:
+    session.info["_commit_started"] = time.perf_counter()
+
+
+def _commit_finished(session) -> None:
+    started = session.info.pop("_commit_started", None)
+    if started is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="db_commit", detail="")
+
+
+def _commit_abandoned(session) -> None:
+    if session.info.pop("_commit_started", None) is not None:
+        STAGE_ERRORS.inc(stage="db_commit", detail="")
+
+
+class StageSummary:
+    """Per-stage totals since the previous ``collect()``, for a periodic event-bus digest."""
+
+    def __init__(self, histogram: Histogram = STAGE_SECONDS):
+        self.histogram = histogram
+        self._last: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def collect(self) -> Dict[str, Dict[str, float]]:
+        current = self.histogram.snapshot()
+        bounds = list(self.histogram.buckets) + [float("inf")]
+        out = {}
+        for key, (counts, total) in current.items():
+            last_counts, last_total = self._last.get(key, ([0] * len(counts), 0.0))
+            delta = [now - before for now, before in zip(counts, last_counts)]
+            count = sum(delta)
+            if not count:
+                continue
+            # p95 as the upper bound of the bucket holding the 95th percentile
+            threshold, running, p95 = count * 0.95, 0, bounds[-1]
+            for bound, n in zip(bounds, delta):
+                running += n
+                if running >= threshold:
+                    p95 = bound
+                    break
+            name = ":".join(part for part in key if part)
+            out[name] = {
+                "count": count,
+                "total_s": round(total - last_total, 3),
+                "mean_s": round((total - last_total) / count, 3),
+                "p95_le_s": p95 if p95 != float("inf") else None,
+            }
+        self._last = current
+        return out
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# Deliberate pauses per point in an action, as (min, max) seconds
+PACING_PROFILES: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "none": {},
+    "light": {
+        "navigate": (0.3, 0.8),
+        "click": (0.1, 0.3),
+        "focus": (0.05, 0.2),
+        "before_send": (0.1, 0.4),
+        "after_send": (0.2, 0.5),
+    },
+    "human": {
+        "navigate": (1.0, 2.0),
+        "click": (0.5, 1.0),
+        "focus": (0.3, 0.7),
+        "before_send": (0.5, 1.0),
+        "after_send": (0.8, 1.5),
+    },
+}
+
+# Network events from the performance log that open and close a request
+_REQUEST_START = "Network.requestWillBeSent"
+_REQUEST_END = ("Network.loadingFinished", "Network.loadingFailed")
+
+
+@dataclass
+class ActionTiming:
+    """Time one browser action spent waiting on the page versus deliberately pausing."""
+
+    ready_s: float = 0.0
+    pacing_s: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"ready_s": round(self.ready_s, 3), "pacing_s": round(self.pacing_s, 3)}
+
+
+class PacingPolicy:
+    """Intentional jitter, kept apart from waiting for the page."""
+
+    def __init__(self, profile: str = "light", sleep: Callable[[float], None] = time.sleep):
+        if profile not in PACING_PROFILES:
+            raise ValueError(f"Unknown pacing profile: {profile}")
+        self.profile = profile
+        self.pauses = PACING_PROFILES[profile]
+        self._sleep = sleep
+
+    def pause(self, point: str) -> float:
+        low, high = self.pauses.get(point, (0.0, 0.0))
+        seconds = random.uniform(low, high) if high > 0 else 0.0
+        if seconds:
+            self._sleep(seconds)
+        return seconds
+
+
+class PageReadiness:
+    """Waits on concrete page signals instead of fixed sleeps.
+
+    ``document.readyState``, an element becoming clickable, and network idle,
+    taken from Chrome's performance log (CDP ``Network.*`` events) when the
+    driver was started with ``goog:loggingPrefs`` performance logging, else
+    from the Resource Timing API.
+    """
+
+    def __init__(self, idle_ms: int = 500, max_inflight: int = 2, poll: float = 0.1):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.idle_ms = idle_ms
+        # Long-lived connections (realtime messaging) never finish; tolerate a few
+        self.max_inflight = max_inflight
+        self.poll = poll
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"actions": 0, "ready_s": 0.0, "pacing_s": 0.0})
+
+    def wait_document_ready(self, driver, timeout: float = 15) -> bool:
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=self.poll).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            return True
+        except TimeoutException:
+            return False
+
+    def wait_for(self, driver, condition, timeout: float = 10):
+        """Result of ``condition`` (an expected_conditions callable) once truthy, else None."""
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=self.poll).until(condition)
+        except TimeoutException:
+            return None
+
+    def drain_network_log(self, driver) -> None:
+        """Drop buffered performance entries, e.g. before a navigation."""
+        try:
+            driver.get_log("performance")
+        except (WebDriverException, AttributeError, ValueError):
+            pass
+
+    def wait_network_idle(self, driver, timeout: float = 10) -> bool:
+        try:
+            return self._wait_idle_cdp(driver, timeout)
+        except (WebDriverException, AttributeError, ValueError):
+            return self._wait_idle_resource_timing(driver, timeout)
+
+    def _wait_idle_cdp(self, driver, timeout: float) -> bool:
+        inflight = set()
+        deadline = time.monotonic() + timeout
+        last_event = time.monotonic()
+        while time.monotonic() < deadline:
+            for entry in driver.get_log("performance"):
+                message = json.loads(entry["message"])["message"]
+                method, params = message.get("method"), message.get("params", {})
+                if method == _REQUEST_START:
+                    inflight.add(params.get("requestId"))
+                    last_event = time.monotonic()
+                elif method in _REQUEST_END:
+                    inflight.discard(params.get("requestId"))
+                    last_event = time.monotonic()
+            if len(inflight) <= self.max_inflight and (time.monotonic() - last_event) * 1000 >= self.idle_ms:
+                return True
+            time.sleep(self.poll)
+        return False
+
+    def _wait_idle_resource_timing(self, driver, timeout: float) -> bool:
+        script = (
+            "const e = performance.getEntriesByType('resource');"
+            "const last = e.length ? Math.max(...e.map(x => x.responseEnd)) : 0;"
+            "return performance.now() - last;"
+        )
+        return bool(self.wait_for(driver, lambda d: (d.execute_script(script) or 0) >= self.idle_ms, timeout))
+
+    def record(self, action: str, timing: ActionTiming) -> None:
+        with self._lock:
+            totals = self._totals[action]
+            totals["actions"] += 1
+            totals["ready_s"] += timing.ready_s
+            totals["pacing_s"] += timing.pacing_s
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                action: {
+                    "actions": int(t["actions"]),
+                    "mean_ready_s": round(t["ready_s"] / t["actions"], 3),
+                    "mean_pacing_s": round(t["pacing_s"] / t["actions"], 3),
+                }
+                for action, t in self._totals.items()
+                if t["actions"]
+            }
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, List, Optional
+
+
+# Lock files Chrome leaves behind when it is killed; they make the next launch
+# believe the profile is still in use by another browser.
+STALE_LOCK_FILES = ["SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile"]
+
+# JSON documents Chrome rewrites on every run; a truncated one means a crash mid-write
+JSON_STATE_FILES = ["Local State", os.path.join("Default", "Preferences")]
+
+COOKIE_FILES = [os.path.join("Default", "Network", "Cookies"), os.path.join("Default", "Cookies")]
+
+LINKEDIN_AUTH_COOKIE = "li_at"
+
+
+class ProfileManager:
+    """Keeps a Chrome user-data-dir alive across restarts.
+
+    The profile is only wiped when it is unreadable, so cookies, cache and the
+    LinkedIn session survive and the next launch starts warm.
+    """
+
+    def __init__(self, profile_dir: str, keep_corrupt: int = 1):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.profile_dir = os.path.abspath(profile_dir)
+        self.keep_corrupt = keep_corrupt
+
+    def prepare(self) -> str:
+        """Make the profile launchable and return its state: warm, cold or reset."""
+        if not os.path.isdir(self.profile_dir):
+            os.makedirs(self.profile_dir, exist_ok=True)
+            return "cold"
+        problems = self.validate()
+        if problems:
+            self.logger.warning("Resetting corrupt Chrome profile %s: %s", self.profile_dir, "; ".join(problems))
+            self.reset()
+            return "reset"
+        self._clear_stale_locks()
+        return "warm" if self.has_cookies() else "cold"
+
+    def validate(self) -> List[str]:
+        problems = []
+        for rel in JSON_STATE_FILES:
+            path = os.path.join(self.profile_dir, rel)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    json.load(fh)
+            except (OSError, ValueError) as exc:
+                problems.append(f"{rel}: {exc}")
+        return problems
+
+    def has_cookies(self) -> bool:
+        return any(os.path.getsize(p) > 0 for p in self._existing(COOKIE_FILES))
+
+    def reset(self) -> None:
+        if os.path.isdir(self.profile_dir):
+            # Keep the last broken copy around for debugging instead of deleting it outright
+            backup = f"{self.profile_dir}.corrupt-{int(time.time())}"
+            try:
+                os.replace(self.profile_dir, backup)
+                self._prune_backups()
+            except OSError:
+                shutil.rmtree(self.profile_dir, ignore_errors=True)
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+    def session_restored(self, driver: Any) -> Optional[bool]:
+        """Whether the launched browser already holds a LinkedIn auth cookie.
+
+        Reads the cookie jar over CDP so no page load is needed; returns None
+        when the driver does not expose CDP.
+        """
+        try:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+        except Exception:
+            return None
+        return any(c.get("name") == LINKEDIN_AUTH_COOKIE and "linkedin.com" in c.get("domain", "") for c in cookies)
+
+    def _clear_stale_locks(self) -> None:
+        for path in self._existing(STALE_LOCK_FILES):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _prune_backups(self) -> None:
+        parent, base = os.path.split(self.profile_dir)
+        backups = sorted(n for n in os.listdir(parent or ".") if n.startswith(f"{base}.corrupt-"))
+        for name in backups[: max(len(backups) - self.keep_corrupt, 0)]:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+    def _existing(self, names: List[str]) -> List[str]:
+        paths = []
+        for rel in names:
+            path = os.path.join(self.profile_dir, rel)
+            # SingletonLock is a dangling symlink once Chrome is gone, so exists() misses it
+            if os.path.lexists(path):
+                paths.append(path)
+        return paths
+
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, count: float, burst: Optional[float] = None) -> "TokenBucket":
+        return cls(rate=count / 60.0, capacity=burst if burst is not None else count)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` would be available (0 if they are now)."""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+            if missing <= 0:
+                return 0.0
+            return float("inf") if self.rate <= 0 else missing / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            wait = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(min(wait, 1.0))
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
@@ -1,103 +1,330 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from flask import current_app
 
-from src.models import db, Lead, Conversation
+from src.models import db, Lead, Conversation, InboxThread
+from src.services.action_scheduler import ActionThrottled
+from src.services.event_bus import bus
+from src.services.linkedin_service import CardSnapshot, InboxMessage, ThreadMessage, thread_url_from
+from src.services.metrics import StageSummary, timed
 
 
 scheduler = BackgroundScheduler()
 
+# Follow-ups generated concurrently before the (sequential) sends of each batch
+FOLLOWUP_GENERATION_BATCH = 10
+
+# How long a send may wait for rate-limit tokens before the job gives up on it
+REPLY_ADMISSION_TIMEOUT_SEC = 120
+FOLLOWUP_ADMISSION_TIMEOUT_SEC = 300
+
+
+class AdaptiveInterval:
+    """Delay before the next inbox poll: the minimum right after new replies,
+    doubling on every quiet pass up to the maximum."""
+
+    def __init__(self, min_seconds: float, max_seconds: float, factor: float = 2.0):
+        self.min_seconds = min_seconds
+        self.max_seconds = max(max_seconds, min_seconds)
+        self.factor = factor
+        self.current = min_seconds
+        self.runs = 0
+        self.last_duration: Optional[float] = None
+        self.last_activity = 0
+        self.busy_seconds = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, activity: int, duration: float) -> float:
+        with self._lock:
+            if activity:
+                self.current = self.min_seconds
+            else:
+                self.current = min(self.max_seconds, self.current * self.factor)
+            self.runs += 1
+            self.last_duration = duration
+            self.last_activity = activity
+            self.busy_seconds += duration
+            return self.current
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                "interval_s": self.current,
+                "min_s": self.min_seconds,
+                "max_s": self.max_seconds,
+                "runs": self.runs,
+                "last_duration_s": round(self.last_duration, 2) if self.last_duration is not None else None,
+                "last_new_replies": self.last_activity,
+                "busy_ratio": round(self.busy_seconds / elapsed, 4) if elapsed else 0.0,
+            }
+
 
 def schedule_jobs(app):
-    # High-frequency inbox checks: every 30 seconds
-    scheduler.add_job(check_inbox_job, "interval", seconds=30, id="check_inbox", replace_existing=True, args=[app])
+    # Inbox polls re-arm themselves after each pass, so they never overlap
+    app.inbox_poll = AdaptiveInterval(
+        min_seconds=app.config["JOB_CHECK_INBOX_MIN_SEC"],
+        max_seconds=app.config["JOB_CHECK_INBOX_INTERVAL_MIN"] * 60,
+    )
+    _schedule_inbox_poll(app, app.inbox_poll.current)
     scheduler.add_job(send_followups_job, "interval", minutes=app.config["JOB_FOLLOWUP_INTERVAL_MIN"], id="send_followups", replace_existing=True, args=[app])
+    if app.config["JOB_METRICS_SUMMARY_INTERVAL_MIN"] > 0:
+        app.stage_summary = StageSummary()
+        scheduler.add_job(metrics_summary_job, "interval", minutes=app.config["JOB_METRICS_SUMMARY_INTERVAL_MIN"], id="metrics_summary", replace_existing=True, args=[app])
+
+
+def _schedule_inbox_poll(app, delay: float) -> None:
+    scheduler.add_job(
+        poll_inbox_job,
+        "date",
+        run_date=datetime.now() + timedelta(seconds=delay),
+        id="check_inbox",
+        replace_existing=True,
+        args=[app],
+        misfire_grace_time=None,
+    )
+
+
+def poll_inbox_job(app):
+    started = time.monotonic()
+    received = 0
+    try:
+        received = check_inbox_job(app)
+    except Exception as exc:
+        app.logger.exception("Inbox check failed: %s", exc)
+    finally:
+        duration = time.monotonic() - started
+        interval = app.inbox_poll.update(received, duration)
+        bus.emit(
+            "info",
+            f"Inbox checked in {duration:.1f}s, {received} new {'reply' if received == 1 else 'replies'}; next check in {interval:.0f}s",
+            {"duration_s": round(duration, 2), "new_replies": received, "interval_s": interval},
+        )
+        _schedule_inbox_poll(app, interval)
 
 
-def check_inbox_job(app):
+@timed("job", "check_inbox")
+def check_inbox_job(app) -> int:
+    """One inbox pass; returns how many new replies it handled."""
+    received = 0
     with app.app_context():
         logger = app.logger
         logger.info("Running inbox check job")
         # Build allowlist of leads we messaged
-        sent_leads = Lead.query.filter_by(message_sent=True).all()
-        url_allow = {l.profile_url for l in sent_leads}
-        messages = app.linkedin_bot.fetch_inbox_latest(allowed_profile_urls=url_allow)
-        for msg in messages:
-            if msg.sender_name != "user":
-                continue
-            # Map to lead by normalized profile URL or by fuzzy name match if URL missing
-            lead = None
-            if getattr(msg, "profile_url", None):
-                lead = Lead.query.filter_by(profile_url=msg.profile_url).first()
-            if not lead:
-                # Try fuzzy match on participant name
-                name = (getattr(msg, "participant_name", None) or "").lower()
-                if name:
-                    lead = (
-                        Lead.query.filter(Lead.name.ilike(f"%{name}%")).order_by(Lead.updated_at.desc()).first()
+        url_allow = {url for (url,) in db.session.query(Lead.profile_url).filter(Lead.message_sent == True)}
+        app.lead_index.refresh()
+        # Replies are typed into the thread the fetch left open, so keep one browser for both.
+        # The inbox slot is admitted ahead of queued follow-ups and first messages.
+        with app.action_scheduler.slot("inbox"):
+            snapshots = _load_inbox_snapshots()
+            seen = {key: snap.fingerprint for key, snap in snapshots.items()}
+            messages = app.linkedin_bot.fetch_inbox_latest(allowed_profile_urls=url_allow, snapshots=snapshots)
+            for msg in messages:
+                if msg.sender_name != "user":
+                    continue
+                # Map to lead by normalized profile URL, else by scored participant name
+                match = app.lead_index.resolve(profile_url=msg.profile_url, name=msg.participant_name)
+                if match is None:
+                    bus.emit(
+                        "warning",
+                        f"No confident lead match for reply from {msg.participant_name or msg.profile_url or 'unknown'}; skipped",
+                        {"profile_url": msg.profile_url, "participant_name": msg.participant_name},
                     )
-            if not lead:
-                lead = Lead.query.order_by(Lead.updated_at.desc()).first()
-
-            if not lead:
-                continue
-            # Deduplicate: skip if an identical recent user message exists
-            recent = (
-                Conversation.query.filter_by(lead_id=lead.id, role="user", content=msg.text)
-                .order_by(Conversation.timestamp.desc())
-                .first()
-            )
-            if recent:
-                continue
-            # Tokenize message time to avoid duplicates; use timestamp seconds as simple token
-            msg_token = str(int(msg.timestamp)) + ":" + (msg.profile_url or "")
-            if lead.last_seen_msg_token == msg_token:
-                continue
-            lead.last_seen_msg_token = msg_token
-
-            # Save user message and refresh conversation context
-            conv = Conversation(lead_id=lead.id, role="user", content=msg.text)
-            db.session.add(conv)
-            lead.reply_status = "replied"
-            db.session.commit()
+                    continue
+                lead = db.session.get(Lead, match.lead_id)
+                if not lead:
+                    app.lead_index.remove(match.lead_id)
+                    continue
+                logger.info("Matched reply to lead %s by %s (confidence %.2f)", lead.id, match.method, match.confidence)
+                if thread_url_from(msg.thread_url):
+                    lead.thread_url = thread_url_from(msg.thread_url)
+                if msg.event_urn:
+                    # LinkedIn's message ids are stable across polls, and a repeated "yes" is
+                    # still a new message: record everything after the last id seen
+                    new = _unseen_incoming(msg, lead.last_seen_msg_token)
+                    if not new:
+                        continue
+                    msg_token = _msg_token(new[-1].event_urn)
+                    texts = [m.text for m in new]
+                else:
+                    # Without a URN, skip text identical to a saved user message
+                    recent = (
+                        Conversation.query.filter_by(lead_id=lead.id, role="user", content=msg.text)
+                        .order_by(Conversation.timestamp.desc())
+                        .first()
+                    )
+                    if recent:
+                        continue
+                    msg_token = str(int(msg.timestamp)) + ":" + (msg.profile_url or "")
+                    texts = [msg.text]
+                if lead.last_seen_msg_token == msg_token:
+                    continue
+                lead.last_seen_msg_token = msg_token
 
-            # Classify and generate reply
-            try:
-                classification = app.gemini_client.classify_reply(lead, msg.text)
-                lead.interest_level = classification.get("interest", lead.interest_level)
+                # Save the user messages and refresh conversation context
+                for text in texts:
+                    db.session.add(Conversation(lead_id=lead.id, role="user", content=text))
+                lead.reply_status = "replied"
                 db.session.commit()
-                # Get full conversation context for this lead
-                context_msgs = Conversation.query.filter_by(lead_id=lead.id).order_by(Conversation.timestamp.asc()).all()
-                history_text = "\n".join([f"[{m.timestamp}] {m.role}: {m.content}" for m in context_msgs][-30:])
-                reply = app.gemini_client.generate_reply(lead, msg.text)
-                if app.linkedin_bot.send_reply(reply):
-                    db.session.add(Conversation(lead_id=lead.id, role="assistant", content=reply))
-                    lead.last_contact_time = datetime.utcnow()
+                received += len(texts)
+
+                # Classify and generate one reply to everything they sent
+                try:
+                    decision = app.gemini_client.respond_to_reply(lead, "\n".join(texts))
+                    lead.interest_level = decision.interest
                     db.session.commit()
-            except Exception as exc:
-                logger.exception("AI reply flow failed: %s", exc)
+                    # Nested in the inbox slot: same browser, only the reply budget is spent.
+                    # The fetch left its last thread open, so go to this lead's thread explicitly.
+                    with app.action_scheduler.slot("reply", timeout=REPLY_ADMISSION_TIMEOUT_SEC):
+                        if lead.thread_url:
+                            sent = app.linkedin_bot.send_reply(
+                                decision.reply, thread_url=lead.thread_url, profile_url=lead.profile_url
+                            )
+                        else:
+                            sent = app.linkedin_bot.send_message(lead.profile_url, decision.reply)
+                    if sent:
+                        lead.thread_url = app.linkedin_bot.last_thread_url or lead.thread_url
+                        db.session.add(Conversation(lead_id=lead.id, role="assistant", content=decision.reply))
+                        lead.last_contact_time = datetime.utcnow()
+                        db.session.commit()
+                        app.gemini_client.refresh_context(lead.id)
+                except ActionThrottled as exc:
+                    bus.emit("warning", f"Reply to {lead.name} not sent, reply budget exhausted: {exc}", {"lead_id": lead.id})
+                except Exception as exc:
+                    logger.exception("AI reply flow failed: %s", exc)
+            # Saved only after the messages are handled so a crash re-opens those threads next run
+            _save_inbox_snapshots(snapshots, seen)
+    return received
+
+
+def _msg_token(event_urn: str) -> str:
+    # The tail keeps the unique part of a long URN within the column
+    return event_urn[-128:]
+
+
+def _unseen_incoming(msg: InboxMessage, last_seen: Optional[str]) -> List[ThreadMessage]:
+    """Incoming messages of the thread after the last one recorded, oldest first.
+
+    When the recorded message is no longer in view, everything the lead sent
+    since our last message counts as new.
+    """
+    recent = [m for m in msg.recent if m.event_urn] or [
+        ThreadMessage(text=msg.text, incoming=True, event_urn=msg.event_urn)
+    ]
+    tokens = [_msg_token(m.event_urn) for m in recent]
+    if last_seen in tokens:
+        window = recent[tokens.index(last_seen) + 1:]
+    else:
+        ours = [i for i, m in enumerate(recent) if not m.incoming]
+        window = recent[ours[-1] + 1:] if ours else recent
+    return [m for m in window if m.incoming and m.text]
+
 
+def _load_inbox_snapshots():
+    return {
+        t.thread_key: CardSnapshot(
+            thread_key=t.thread_key,
+            preview=t.preview or "",
+            last_activity=t.last_activity or "",
+            unread=t.unread,
+        )
+        for t in InboxThread.query.all()
+    }
 
+
+def _save_inbox_snapshots(snapshots, seen):
+    changed = {key: snap for key, snap in snapshots.items() if seen.get(key) != snap.fingerprint}
+    if not changed:
+        return
+    existing = {t.thread_key: t for t in InboxThread.query.filter(InboxThread.thread_key.in_(list(changed)))}
+    for key, snap in changed.items():
+        row = existing.get(key) or InboxThread(thread_key=key)
+        row.fingerprint = snap.fingerprint
+        row.preview = snap.preview
+        row.last_activity = snap.last_activity
+        row.unread = snap.unread
+        db.session.add(row)
+    db.session.commit()
+
+
+def due_followup_ids(cutoff: datetime, limit: int) -> List[int]:
+    """Ids of leads due a follow-up, oldest contact first, at most ``limit``.
+
+    Two range scans of ix_leads_followup (never contacted, then contacted
+    before the cutoff) rather than one OR, which SQLite can only answer by
+    walking every sent, unreplied lead.
+    """
+    due = Lead.query.with_entities(Lead.id).filter(Lead.message_sent == True, Lead.reply_status == "not replied")  # noqa: E712
+    ids = [lead_id for (lead_id,) in due.filter(Lead.last_contact_time.is_(None)).order_by(Lead.id).limit(limit)]
+    if len(ids) < limit:
+        ids += [
+            lead_id
+            for (lead_id,) in due.filter(Lead.last_contact_time < cutoff)
+            .order_by(Lead.last_contact_time, Lead.id)
+            .limit(limit - len(ids))
+        ]
+    return ids
+
+
+@timed("job", "send_followups")
 def send_followups_job(app):
     with app.app_context():
         logger = app.logger
         logger.info("Running follow-up job")
         cutoff = datetime.utcnow() - timedelta(hours=app.config["FOLLOWUP_AFTER_HOURS"])
-        leads = Lead.query.filter(Lead.message_sent == True, Lead.reply_status == "not replied").all()
-        for lead in leads:
-            if not lead.last_contact_time or lead.last_contact_time < cutoff:
+        due = due_followup_ids(cutoff, app.config["FOLLOWUP_MAX_PER_RUN"])
+        for start in range(0, len(due), FOLLOWUP_GENERATION_BATCH):
+            chunk = due[start:start + FOLLOWUP_GENERATION_BATCH]
+            by_id = {lead.id: lead for lead in Lead.query.filter(Lead.id.in_(chunk))}
+            batch = [by_id[lead_id] for lead_id in chunk if lead_id in by_id]
+            try:
+                followups = app.gemini_client.generate_followup_messages(batch)
+            except Exception as exc:
+                logger.exception("Follow-up generation failed: %s", exc)
+                continue
+            throttled = False
+            for lead, followup in zip(batch, followups):
                 try:
-                    followup = app.gemini_client.generate_followup_message(lead)
-                    if app.linkedin_bot.send_message(lead.profile_url, followup):
+                    with app.action_scheduler.slot("followup", timeout=FOLLOWUP_ADMISSION_TIMEOUT_SEC):
+                        sent = app.linkedin_bot.send_message(lead.profile_url, followup, thread_url=lead.thread_url)
+                    if sent:
+                        lead.thread_url = app.linkedin_bot.last_thread_url or lead.thread_url
                         db.session.add(Conversation(lead_id=lead.id, role="assistant", content=followup))
                         lead.follow_up_taken = True
                         lead.last_contact_time = datetime.utcnow()
+                        # Persist each send before the next one so a crash cannot message this lead again
                         db.session.commit()
+                        app.gemini_client.refresh_context(lead.id)
+                except ActionThrottled as exc:
+                    # The rest stay due and are picked up by a later run
+                    bus.emit("info", f"Follow-up budget exhausted; stopping this pass: {exc}")
+                    throttled = True
+                    break
                 except Exception as exc:
+                    # Only this lead's changes are lost; earlier sends are committed
+                    db.session.rollback()
                     logger.exception("Follow-up failed for %s: %s", lead.profile_url, exc)
+            # Sends are already committed; this is for anything else the pass touched.
+            # The batch's leads are then released from the session.
+            db.session.commit()
+            db.session.expunge_all()
+            if throttled:
+                return
 
 
+def metrics_summary_job(app):
+    """Post where pipeline time went since the last summary, slowest stages first."""
+    stages = app.stage_summary.collect()
+    if not stages:
+        return
+    ranked = sorted(stages.items(), key=lambda item: item[1]["total_s"], reverse=True)
+    top = ", ".join(f"{name} {s['total_s']:.1f}s/{s['count']}" for name, s in ranked[:5])
+    bus.emit("info", f"Time by stage: {top}", {"stages": stages})
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+Locator = Tuple[str, str]
+
+
+@dataclass
+class SelectorMatch:
+    element: object
+    locator: Locator
+    fallback: bool  # matched by something other than the last winner
+    seconds: float
+
+
+class SelectorRegistry:
+    """Remembers which locator found each UI target and tries it first.
+
+    ``find`` polls every candidate in one wait, last winner first and the
+    rest by hit count, so a stable layout costs one lookup per poll and a
+    changed one costs a single timeout instead of one per locator. Hit
+    counts live in their own SQLite file (lookups run on worker threads
+    outside any Flask app context) and survive restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, on_drift: Optional[Callable[[str, Locator, Locator], None]] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.on_drift = on_drift
+        self._lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS selector_hits ("
+            " target TEXT NOT NULL,"
+            " by TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0,"
+            " last_hit_at REAL,"
+            " PRIMARY KEY (target, by, value))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS selector_targets ("
+            " target TEXT PRIMARY KEY,"
+            " lookups INTEGER NOT NULL DEFAULT 0,"
+            " first_try INTEGER NOT NULL DEFAULT 0,"
+            " fallbacks INTEGER NOT NULL DEFAULT 0,"
+            " misses INTEGER NOT NULL DEFAULT 0,"
+            " total_s REAL NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+        self._hits: Dict[str, Dict[Locator, Tuple[int, float]]] = {}
+        for target, by, value, hits, last_hit_at in self._conn.execute(
+            "SELECT target, by, value, hits, last_hit_at FROM selector_hits"
+        ):
+            self._hits.setdefault(target, {})[(by, value)] = (hits, last_hit_at or 0.0)
+
+    def ordered(self, target: str, locators: Sequence[Locator]) -> List[Locator]:
+        """Last winner first, then by hits, then in the order given."""
+        with self._lock:
+            seen = self._hits.get(target, {})
+            winner = self._winner(target, locators)
+            return sorted(
+                locators,
+                key=lambda loc: (loc != winner, -seen.get(tuple(loc), (0, 0.0))[0], list(locators).index(loc)),
+            )
+
+    def _winner(self, target: str, locators: Sequence[Locator]) -> Optional[Locator]:
+        seen = self._hits.get(target, {})
+        known = [tuple(loc) for loc in locators if tuple(loc) in seen]
+        return max(known, key=lambda loc: seen[loc][1]) if known else None
+
+    def find(self, driver, target: str, locators: Sequence[Locator], timeout: float = 10,
+             condition: Callable = EC.element_to_be_clickable,
+             wait: Optional[Callable] = None) -> Optional[SelectorMatch]:
+        """First element matching any locator, or None on timeout.
+
+        ``condition`` wraps one locator (an expected_conditions factory);
+        ``wait(condition, timeout)`` runs the combined wait and defaults to a
+        plain WebDriverWait.
+        """
+        order = self.ordered(target, locators)
+        checks = [(loc, condition(loc)) for loc in order]
+
+        def race(d):
+            for loc, check in checks:
+                try:
+                    element = check(d)
+                except (StaleElementReferenceException, WebDriverException):
+                    continue
+                if element:
+                    return loc, element
+            return False
+
+        started = time.monotonic()
+        if wait is None:
+            try:
+                result = WebDriverWait(driver, timeout, poll_frequency=0.1).until(race)
+            except TimeoutException:
+                result = None
+        else:
+            result = wait(race, timeout)
+        seconds = time.monotonic() - started
+        if not result:
+            self._record(target, None, False, seconds)
+            return None
+        loc, element = result
+        fallback = tuple(loc) != tuple(order[0])
+        self._record(target, tuple(loc), fallback, seconds, previous=tuple(order[0]))
+        return SelectorMatch(element=element, locator=tuple(loc), fallback=fallback, seconds=seconds)
+
+    def _record(self, target: str, locator: Optional[Locator], fallback: bool, seconds: float,
+                previous: Optional[Locator] = None) -> None:
+        now = time.time()
+        drifted = False
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO selector_targets (target, lookups, first_try, fallbacks, misses, total_s) "
+                "VALUES (?, 1, ?, ?, ?, ?) ON CONFLICT(target) DO UPDATE SET "
+                "lookups = lookups + 1, first_try = first_try + excluded.first_try, "
+                "fallbacks = fallbacks + excluded.fallbacks, misses = misses + excluded.misses, "
+                "total_s = total_s + excluded.total_s",
+                (target, int(locator is not None and not fallback), int(fallback), int(locator is None), seconds),
+            )
+            if locator is not None:
+                seen = self._hits.setdefault(target, {})
+                # Only a change of an established winner counts as drift, not the first hit
+                drifted = fallback and previous in seen
+                hits = seen.get(locator, (0, 0.0))[0] + 1
+                seen[locator] = (hits, now)
+                self._conn.execute(
+                    "INSERT INTO selector_hits (target, by, value, hits, last_hit_at) VALUES (?, ?, ?, 1, ?) "
+                    "ON CONFLICT(target, by, value) DO UPDATE SET hits = hits + 1, last_hit_at = excluded.last_hit_at",
+                    (target, locator[0], locator[1], now),
+                )
+            self._conn.commit()
+        if drifted:
+            self.logger.warning("Selector for %s moved from %s to %s", target, previous, locator)
+            if self.on_drift is not None:
+                self.on_drift(target, previous, locator)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT target, lookups, first_try, fallbacks, misses, total_s FROM selector_targets ORDER BY target"
+            ).fetchall()
+            out = {}
+            for target, lookups, first_try, fallbacks, misses, total_s in rows:
+                seen = self._hits.get(target, {})
+                winner = max(seen, key=lambda loc: seen[loc][1]) if seen else None
+                out[target] = {
+                    "lookups": lookups,
+                    "first_try": first_try,
+                    "fallbacks": fallbacks,
+                    "misses": misses,
+                    "mean_s": round(total_s / lookups, 3) if lookups else 0.0,
+                    "winner": f"{winner[0]}={winner[1]}" if winner else None,
+                    "hits": {f"{by}={value}": hits for (by, value), (hits, _) in seen.items()},
+                }
+            return out
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import or_
+
+from src.models import Conversation, Lead, SendJob, SendJobItem, db
+from src.services.action_scheduler import ActionThrottled
+from src.services.event_bus import bus
+from src.services.metrics import timed
+
+# How long a claimed item waits for a first-message slot before going back to the queue
+FIRST_MESSAGE_ADMISSION_TIMEOUT_SEC = 60
+# Longest a worker sleeps on a spent budget before checking again
+MAX_THROTTLED_SLEEP_SEC = 3600
+
+
+class SendQueue:
+    """SQLite-backed queue of outbound sends drained by a background worker.
+
+    Routes enqueue a job and return immediately; each worker thread claims a
+    small batch of items at a time, so a crash or restart resumes from the
+    persisted state.
+    Run one worker per pooled browser session to send in parallel.
+    A claim is a lease: it is renewed before each send, and only an item
+    whose lease has run out (its worker died) is claimed again, so several
+    processes can share one database without sending twice.
+    """
+
+    def __init__(self, app, poll_interval: float = 2.0, max_attempts: int = 2, concurrency: int = 1,
+                 batch_size: int = 5, lease_seconds: float = 600.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.app = app
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def enqueue_first_messages(self) -> SendJob:
+        """Queue every unsent lead that is not already waiting in another job."""
+        already_queued = (
+            db.session.query(SendJobItem.lead_id)
+            .filter(SendJobItem.status.in_(("pending", "running")))
+            .subquery()
+        )
+        lead_ids = [
+            row.id
+            for row in db.session.query(Lead.id)
+            .filter(Lead.message_sent == False, Lead.id.notin_(already_queued.select()))  # noqa: E712
+            .order_by(Lead.id.asc())
+        ]
+        job = SendJob(kind="first_message", total=len(lead_ids), status="queued" if lead_ids else "done")
+        if not lead_ids:
+            job.finished_at = datetime.utcnow()
+        db.session.add(job)
+        db.session.flush()
+        db.session.bulk_insert_mappings(SendJobItem, [{"job_id": job.id, "lead_id": lid} for lid in lead_ids])
+        db.session.commit()
+        bus.emit("info", f"Queued {len(lead_ids)} first messages (job #{job.id})", {"job_id": job.id, "total": len(lead_ids)})
+        self.start()
+        self._wake.set()
+        return job
+
+    def start(self) -> None:
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.concurrency):
+                thread = threading.Thread(target=self._run, name=f"send-queue-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    items = self._claim_batch()
+                    retry_after = self._process_batch(items) if items else None
+                    if items and retry_after is None:
+                        continue
+            except Exception as exc:
+                self.logger.exception("Send queue worker error: %s", exc)
+                with self.app.app_context():
+                    db.session.rollback()
+                retry_after = None
+            if retry_after:
+                # Sleep until the budget refills: claiming earlier would only generate the batch again
+                self.logger.info("First-message budget spent; pausing %.0fs", min(retry_after, MAX_THROTTLED_SLEEP_SEC))
+                self._stop.wait(min(retry_after, MAX_THROTTLED_SLEEP_SEC))
+                continue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim_batch(self) -> List[SendJobItem]:
+        items = []
+        while len(items) < self.batch_size:
+            item = self._claim_next()
+            if item is None:
+                break
+            items.append(item)
+        return items
+
+    def _claimable(self, now: datetime):
+        # Pending, or running under a lease that ran out (no lease: claimed before leases existed)
+        return or_(
+            SendJobItem.status == "pending",
+            (SendJobItem.status == "running") & or_(SendJobItem.lease_until.is_(None), SendJobItem.lease_until < now),
+        )
+
+    def _claim_next(self) -> Optional[SendJobItem]:
+        while True:
+            now = datetime.utcnow()
+            # Abandoned items first (few rows, index on status), then the queue in order
+            candidate = (
+                db.session.query(SendJobItem.id, SendJobItem.status)
+                .filter(SendJobItem.status == "running", or_(SendJobItem.lease_until.is_(None), SendJobItem.lease_until < now))
+                .order_by(SendJobItem.job_id.asc(), SendJobItem.id.asc())
+                .first()
+            ) or (
+                db.session.query(SendJobItem.id, SendJobItem.status)
+                .filter_by(status="pending")
+                .order_by(SendJobItem.job_id.asc(), SendJobItem.id.asc())
+                .first()
+            )
+            if candidate is None:
+                return None
+            # Conditional update so two workers never claim the same item
+            claimed = (
+                SendJobItem.query.filter(SendJobItem.id == candidate.id, self._claimable(now))
+                .update({
+                    "status": "running",
+                    "attempts": SendJobItem.attempts + 1,
+                    "claimed_by": self.owner,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                }, synchronize_session=False)
+            )
+            db.session.commit()
+            if claimed:
+                break
+        if candidate.status == "running":
+            self.logger.info("Reclaimed send item %d from an expired lease", candidate.id)
+        item = db.session.get(SendJobItem, candidate.id)
+        started = (
+            SendJob.query.filter_by(id=item.job_id, status="queued")
+            .update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+        )
+        db.session.commit()
+        if started:
+            job = item.job
+            bus.emit("info", f"Job #{job.id} started ({job.total} leads)", {"job_id": job.id, "total": job.total})
+        return item
+
+    def _process_batch(self, items: List[SendJobItem]) -> Optional[float]:
+        """Send a claimed batch; if the first-message budget ran out part way, seconds until it refills."""
+        leads = {item.id: db.session.get(Lead, item.lead_id) for item in items}
+        pending = [item for item in items if leads[item.id] is not None and not leads[item.id].message_sent]
+        # Generate the whole batch up front so LLM latency overlaps instead of adding up
+        try:
+            generated = self.app.gemini_client.generate_first_messages([leads[item.id] for item in pending])
+        except Exception as exc:
+            self.logger.exception("Batch message generation failed: %s", exc)
+            generated = [None] * len(pending)
+        messages = {item.id: message for item, message in zip(pending, generated)}
+        retry_after = None
+        for item in items:
+            if retry_after is not None:
+                self._requeue(item)
+            else:
+                retry_after = self._process(item, leads[item.id], messages.get(item.id))
+        return retry_after
+
+    @timed("job", "send_queue_item")
+    def _process(self, item: SendJobItem, lead: Optional[Lead], message: Optional[str]) -> Optional[float]:
+        if not self._renew_lease(item):
+            self.logger.warning("Lease on send item %d expired and was taken over; skipping it", item.id)
+            return None
+        job = item.job
+        if lead is None or lead.message_sent:
+            item.status = "skipped"
+        else:
+            try:
+                if message is None:
+                    message = self.app.gemini_client.generate_first_message(lead)
+                # Waits behind replies and follow-ups and within the first-message budget
+                with self.app.action_scheduler.slot("first_message", timeout=FIRST_MESSAGE_ADMISSION_TIMEOUT_SEC):
+                    ok = self.app.linkedin_bot.send_message(lead.profile_url, message, thread_url=lead.thread_url)
+            except ActionThrottled as exc:
+                self.logger.info("First-message budget exhausted; re-queueing %s", lead.profile_url)
+                self._requeue(item)
+                # At least a poll interval when it only lost out on a busy browser
+                return max(exc.retry_after, self.poll_interval)
+            except Exception as exc:
+                db.session.rollback()
+                self.logger.exception("Queued send failed for %s: %s", lead.profile_url, exc)
+                ok, item.error = False, str(exc)[:500]
+            if ok:
+                lead.message_sent = True
+                lead.thread_url = self.app.linkedin_bot.last_thread_url or lead.thread_url
+                lead.last_contact_time = datetime.utcnow()
+                db.session.add(Conversation(lead_id=lead.id, role="assistant", content=message, timestamp=datetime.utcnow()))
+                item.status = "sent"
+                self._bump(job, "sent")
+            elif item.attempts < self.max_attempts:
+                item.status = "pending"
+            else:
+                item.status = "failed"
+                self._bump(job, "failed")
+        finished = self._finish_if_drained(job)
+        db.session.commit()
+        db.session.refresh(job)
+        self._emit_progress(job, lead, item, finished)
+        if item.status == "sent":
+            self.app.gemini_client.refresh_context(lead.id)
+        return None
+
+    def _renew_lease(self, item: SendJobItem) -> bool:
+        """Extend this worker's claim on ``item``; False if another worker holds it now."""
+        renewed = (
+            SendJobItem.query.filter_by(id=item.id, status="running", claimed_by=self.owner)
+            .update({"lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)},
+                    synchronize_session=False)
+        )
+        db.session.commit()
+        return bool(renewed)
+
+    def _requeue(self, item: SendJobItem) -> None:
+        # Not sent for lack of budget, so the claim does not use up an attempt
+        item.status = "pending"
+        item.attempts = max((item.attempts or 1) - 1, 0)
+        item.claimed_by = item.lease_until = None
+        db.session.commit()
+
+    def _bump(self, job: SendJob, counter: str) -> None:
+        # Increment in SQL; parallel workers would lose updates with job.sent += 1
+        column = getattr(SendJob, counter)
+        SendJob.query.filter_by(id=job.id).update({counter: column + 1}, synchronize_session=False)
+
+    def _finish_if_drained(self, job: SendJob) -> bool:
+        db.session.flush()
+        open_items = SendJobItem.query.filter(
+            SendJobItem.job_id == job.id, SendJobItem.status.in_(("pending", "running"))
+        ).count()
+        if open_items:
+            return False
+        return bool(
+            SendJob.query.filter(SendJob.id == job.id, SendJob.status != "done").update(
+                {"status": "done", "finished_at": datetime.utcnow()}, synchronize_session=False
+            )
+        )
+
+    def _emit_progress(self, job: SendJob, lead: Optional[Lead], item: SendJobItem, finished: bool) -> None:
+        processed = SendJobItem.query.filter(
+            SendJobItem.job_id == job.id, SendJobItem.status.in_(("sent", "failed", "skipped"))
+        ).count()
+        elapsed = max((datetime.utcnow() - (job.started_at or job.created_at)).total_seconds(), 1e-6)
+        rate = processed / elapsed * 60.0
+        remaining = max(job.total - processed, 0)
+        extra = {
+            "job_id": job.id,
+            "lead_id": item.lead_id,
+            "item_status": item.status,
+            "processed": processed,
+            "total": job.total,
+            "sent": job.sent,
+            "failed": job.failed,
+            "rate_per_min": round(rate, 2),
+            "eta_s": round(remaining / rate * 60.0, 1) if rate > 0 else None,
+        }
+        name = lead.name if lead is not None else f"lead {item.lead_id}"
+        bus.emit("info", f"Job #{job.id}: {processed}/{job.total} ({item.status} {name}, {rate:.1f}/min)", extra)
+        if finished:
+            bus.emit("success", f"Job #{job.id} finished: {job.sent} sent, {job.failed} failed", extra)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Dict, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from src.services.event_bus import EventBus, Subscription
+
+
+class EventStreamServer:
+    """Serves /events to many SSE clients from one asyncio loop.
+
+    Flask's /events keeps one WSGI thread blocked per open tab. Here every
+    client is a coroutine on a single loop thread, and a single bridge thread
+    waits on the EventBus and wakes all of them when something is emitted.
+    """
+
+    def __init__(self, bus: EventBus, host: str = "127.0.0.1", port: int = 5001,
+                 heartbeat: float = 15.0, dashboard_port: int = 5000,
+                 allow_origins: Optional[Sequence[str]] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.heartbeat = heartbeat
+        # Without an explicit list, only pages served by the dashboard itself may read the stream
+        self.dashboard_port = dashboard_port
+        self.allow_origins = {o.rstrip("/") for o in allow_origins or () if o}
+        self.clients = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._generation: Optional[asyncio.Event] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        loop_thread = threading.Thread(target=self._run_loop, name="sse-loop", daemon=True)
+        loop_thread.start()
+        self._ready.wait(10)
+        if self._server is None:
+            return
+        bridge = threading.Thread(target=self._bridge, name="sse-bridge", daemon=True)
+        bridge.start()
+        self._threads = [loop_thread, bridge]
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        for thread in self._threads:
+            thread.join(5)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None and not self._stop.is_set()
+
+    def stats(self) -> Dict[str, int]:
+        return {"clients": self.clients, "last_seq": self.bus.last_seq}
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._generation = asyncio.Event()
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+            )
+        except OSError as exc:
+            self.logger.error("Event stream server could not bind %s:%d: %s", self.host, self.port, exc)
+            loop.close()
+            self._ready.set()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info("Event stream server listening on %s:%d", self.host, self.port)
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            loop.run_until_complete(self._server.wait_closed())
+            loop.close()
+
+    def _origin_allowed(self, origin: str, host_header: str) -> bool:
+        if self.allow_origins:
+            return origin.rstrip("/") in self.allow_origins
+        # The dashboard's own origin: the host this request came to, on the Flask port
+        parsed = urlsplit(origin)
+        requested_host = urlsplit(f"//{host_header}").hostname
+        return parsed.scheme in ("http", "https") and bool(parsed.hostname) \
+            and parsed.hostname == requested_host and parsed.port == self.dashboard_port
+
+    def _bridge(self) -> None:
+        # The only thread that blocks on the bus; everything else is async
+        cursor = self.bus.last_seq
+        while not self._stop.is_set():
+            if self.bus.wait_for(cursor, timeout=1.0):
+                cursor = self.bus.last_seq
+                self._loop.call_soon_threadsafe(self._notify)
+
+    def _notify(self) -> None:
+        # Swap in a fresh Event before setting the old one, so a client that
+        # captured the old generation before reading can never miss a wakeup.
+        fired, self._generation = self._generation, asyncio.Event()
+        fired.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        sub: Optional[Subscription] = None
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = (request_line.split(" ") + ["", ""])[:3]
+            url = urlsplit(target)
+            if method != "GET" or url.path != "/events":
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+            origin = headers.get("origin")
+            if origin and not self._origin_allowed(origin, headers.get("host", "")):
+                writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                return
+            last_id = headers.get("last-event-id") or parse_qs(url.query).get("last_event_id", [""])[0]
+            sub = self.bus.subscribe(int(last_id) if last_id.isdigit() else None)
+
+            cors = f"Access-Control-Allow-Origin: {origin}\r\nVary: Origin\r\n" if origin else ""
+            writer.write((
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: text/event-stream\r\n"
+                "Cache-Control: no-cache\r\n"
+                f"{cors}"
+                "Connection: close\r\n\r\n"
+                "retry: 3000\n\n"
+            ).encode())
+            self.clients += 1
+            await self._stream(sub, writer)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            if sub is not None:
+                self.clients -= 1
+                self.bus.unsubscribe(sub)
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _stream(self, sub: Subscription, writer: asyncio.StreamWriter) -> None:
+        while not self._stop.is_set():
+            generation = self._generation
+            events, missed = sub.poll(timeout=0)
+            if missed:
+                writer.write(f"event: lag\ndata: {json.dumps({'missed': missed, 'total_missed': sub.missed})}\n\n".encode())
+            for event in events:
+                writer.write(f"id: {event['seq']}\ndata: {json.dumps(event)}\n\n".encode())
+            if not events and not missed:
+                try:
+                    await asyncio.wait_for(generation.wait(), self.heartbeat)
+                    continue
+                except asyncio.TimeoutError:
+                    writer.write(b": heartbeat\n\n")
+            # A slow client only stalls its own coroutine here
+            await writer.drain()
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from selenium.webdriver.common.keys import Keys
+
+
+@dataclass(frozen=True)
+class PacingProfile:
+    max_chunk_chars: int  # 0 = the whole message at once; chunks never split a word
+    pause: Tuple[float, float]  # seconds between chunks
+
+
+PACING_PROFILES: Dict[str, PacingProfile] = {
+    "instant": PacingProfile(max_chunk_chars=0, pause=(0.0, 0.0)),
+    "brisk": PacingProfile(max_chunk_chars=24, pause=(0.04, 0.12)),
+    "human": PacingProfile(max_chunk_chars=1, pause=(0.03, 0.12)),
+}
+
+# Focus the element, put the caret at the end and insert through the editing
+# pipeline so the page sees the same beforeinput/input events as typing.
+INSERT_TEXT_JS = """
+const el = arguments[0], text = arguments[1];
+el.focus();
+if (el.isContentEditable) {
+  const range = document.createRange();
+  range.selectNodeContents(el);
+  range.collapse(false);
+  const sel = window.getSelection();
+  sel.removeAllRanges();
+  sel.addRange(range);
+  let ok = false;
+  try { ok = document.execCommand('insertText', false, text); } catch (e) {}
+  if (!ok) {
+    el.dispatchEvent(new InputEvent('beforeinput', {inputType: 'insertText', data: text, bubbles: true, cancelable: true}));
+    el.append(document.createTextNode(text));
+    el.dispatchEvent(new InputEvent('input', {inputType: 'insertText', data: text, bubbles: true}));
+  }
+} else {
+  el.value += text;
+  el.dispatchEvent(new InputEvent('input', {inputType: 'insertText', data: text, bubbles: true}));
+}
+return true;
+"""
+
+_CHUNK_RE = re.compile(r"\S+\s*|\s+")
+_NON_BMP_RE = re.compile("([\U00010000-\U0010FFFF]+)")
+
+
+def split_chunks(text: str, max_chars: int) -> List[str]:
+    """Split on word boundaries into chunks of at most ``max_chars`` (a word is never split)."""
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text] if text else []
+    chunks: List[str] = []
+    current = ""
+    for word in _CHUNK_RE.findall(text):
+        if current and len(current) + len(word) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += word
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class EntryResult:
+    strategy: str
+    chars: int
+    chunks: int
+    seconds: float
+    fallback: bool = False
+
+
+class TextEntry:
+    """Types a message into a focused input using one of three strategies.
+
+    ``cdp``: Chrome's ``Input.insertText`` (one command per chunk, any Unicode).
+    ``script``: one ``execute_script`` per chunk that inserts and fires input events.
+    ``keys``: ``send_keys`` per chunk. ChromeDriver rejects characters outside the
+    BMP (emoji and the like), so those runs go through ``Input.insertText``.
+    If ``cdp`` fails, ``script`` is used; if that fails, ``keys``.
+    """
+
+    STRATEGIES = ("cdp", "script", "keys")
+
+    def __init__(self, strategy: str = "cdp", pacing: str = "brisk"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown text entry strategy: {strategy}")
+        if pacing not in PACING_PROFILES:
+            raise ValueError(f"Unknown pacing profile: {pacing}")
+        self.strategy = strategy
+        self.pacing = PACING_PROFILES[pacing]
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"messages": 0, "chars": 0, "seconds": 0.0})
+
+    def enter(self, driver, element, text: str) -> EntryResult:
+        chunks = split_chunks(text, self.pacing.max_chunk_chars)
+        order = self.STRATEGIES[self.STRATEGIES.index(self.strategy):]
+        started = time.perf_counter()
+        for position, strategy in enumerate(order):
+            try:
+                # A strategy that fails part-way must not leave half a message behind
+                if position:
+                    element.clear()
+                self._run(strategy, driver, element, chunks)
+                break
+            except Exception as exc:
+                if strategy == order[-1]:
+                    raise
+                self.logger.warning("Text entry via %s failed (%s); falling back", strategy, exc)
+        result = EntryResult(
+            strategy=strategy,
+            chars=len(text),
+            chunks=len(chunks),
+            seconds=time.perf_counter() - started,
+            fallback=strategy != self.strategy,
+        )
+        with self._lock:
+            totals = self._totals[strategy]
+            totals["messages"] += 1
+            totals["chars"] += result.chars
+            totals["seconds"] += result.seconds
+        return result
+
+    def _run(self, strategy: str, driver, element, chunks: List[str]) -> None:
+        for index, chunk in enumerate(chunks):
+            if index and self.pacing.pause[1] > 0:
+                time.sleep(random.uniform(*self.pacing.pause))
+            if strategy == "cdp":
+                driver.execute_cdp_cmd("Input.insertText", {"text": chunk})
+            elif strategy == "script":
+                driver.execute_script(INSERT_TEXT_JS, element, chunk)
+            else:
+                self._send_keys(driver, element, chunk)
+
+    def _send_keys(self, driver, element, chunk: str) -> None:
+        for run in _NON_BMP_RE.split(chunk):
+            if not run:
+                continue
+            if _NON_BMP_RE.fullmatch(run):
+                try:
+                    driver.execute_cdp_cmd("Input.insertText", {"text": run})
+                except Exception:
+                    driver.execute_script(INSERT_TEXT_JS, element, run)
+                continue
+            # Enter sends the message in LinkedIn's composer; Shift+Enter is a line break
+            lines = run.split("\n")
+            for number, line in enumerate(lines):
+                if number:
+                    element.send_keys(Keys.SHIFT, Keys.ENTER)
+                if line:
+                    element.send_keys(line)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                strategy: {
+                    "messages": int(t["messages"]),
+                    "chars": int(t["chars"]),
+                    "mean_s": round(t["seconds"] / t["messages"], 3) if t["messages"] else 0.0,
+                }
+                for strategy, t in self._totals.items()
+            }